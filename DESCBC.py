@@ -1,26 +1,134 @@
 # -*- coding: UTF-8 -*-
 import base64
-import pyDes
 import hashlib
+import threading
 
 headers={"User-Agent": "Dalvik/2.1.0"}
 
+# 章节正文的固定密钥
+CONTENT_KEY = "KW8Dvm2N"  # 加密的key
+CONTENT_IV = "1ae2c94b"  # 偏移量
+
+
+def _unpad(data):
+    """去除PKCS5填充"""
+    return data[:-data[-1]] if data else data
+
+
+class PyDesBackend:
+    """纯Python实现，作为兜底；des对象有内部状态，按线程缓存"""
+    name = 'pyDes'
+
+    def __init__(self):
+        import pyDes
+        self._pyDes = pyDes
+        self._local = threading.local()
+
+    def decrypt(self, key, iv, data):
+        ciphers = getattr(self._local, 'ciphers', None)
+        if ciphers is None:
+            ciphers = self._local.ciphers = {}
+        method = ciphers.get((key, iv))
+        if method is None:
+            if len(ciphers) > 64:
+                ciphers.clear()
+            method = self._pyDes.des(key, self._pyDes.CBC, iv, pad=None, padmode=self._pyDes.PAD_PKCS5)
+            ciphers[(key, iv)] = method
+        return method.decrypt(data)
+
+
+class PyCryptodomeBackend:
+    """pycryptodome的C实现，CBC对象有状态，每次新建（开销很小）"""
+    name = 'pycryptodome'
+
+    def __init__(self):
+        from Crypto.Cipher import DES
+        self._DES = DES
+
+    def decrypt(self, key, iv, data):
+        cipher = self._DES.new(key.encode(), self._DES.MODE_CBC, iv.encode())
+        return _unpad(cipher.decrypt(data))
+
+
+class CryptographyBackend:
+    """cryptography(OpenSSL)实现；三个子密钥相同的TripleDES即单DES，Cipher对象按密钥缓存"""
+    name = 'cryptography'
+
+    def __init__(self):
+        from cryptography.hazmat.primitives.ciphers import Cipher, modes
+        try:
+            from cryptography.hazmat.decrepit.ciphers.algorithms import TripleDES
+        except ImportError:
+            from cryptography.hazmat.primitives.ciphers.algorithms import TripleDES
+        self._Cipher = Cipher
+        self._CBC = modes.CBC
+        self._TripleDES = TripleDES
+        self._ciphers = {}
+
+    def decrypt(self, key, iv, data):
+        cipher = self._ciphers.get((key, iv))
+        if cipher is None:
+            if len(self._ciphers) > 64:
+                self._ciphers.clear()
+            cipher = self._Cipher(self._TripleDES(key.encode() * 3), self._CBC(iv.encode()))
+            self._ciphers[(key, iv)] = cipher
+        decryptor = cipher.decryptor()
+        return _unpad(decryptor.update(data) + decryptor.finalize())
+
+
+# 按优先级尝试的解密后端
+BACKENDS = (CryptographyBackend, PyCryptodomeBackend, PyDesBackend)
+
+_backend = None
+
+
+def available_backends():
+    """当前环境可用的后端名"""
+    names = []
+    for cls in BACKENDS:
+        try:
+            cls()
+        except ImportError:
+            continue
+        names.append(cls.name)
+    return names
+
+
+def set_backend(name=None):
+    """
+    选择解密后端
+    :param name: 后端名，None按优先级自动选择已安装的C实现，都没有时使用pyDes
+    :return: 选中的后端名
+    """
+    global _backend
+    for cls in BACKENDS:
+        if name is not None and cls.name != name:
+            continue
+        try:
+            _backend = cls()
+        except ImportError:
+            continue
+        return _backend.name
+    raise ImportError(f'DES解密后端不可用：{name}')
+
+
+def get_backend():
+    if _backend is None:
+        set_backend()
+    return _backend
+
+
 def md5_encrypt(data):
     md5 = hashlib.md5()
     md5.update(data.encode('utf-8'))
     return md5.hexdigest()
 
 def decrypt_str(data):
-    Key = "KW8Dvm2N"  # 加密的key
-    Iv = "1ae2c94b"  # 偏移量
-    method = pyDes.des(Key, pyDes.CBC, Iv, pad=None, padmode=pyDes.PAD_PKCS5)
-    k = base64.b64decode(data)
-    return method.decrypt(k)
+    return decrypt_str1(data, CONTENT_KEY, CONTENT_IV)
 
 def decrypt_str1(data,Key,Iv):
-    method = pyDes.des(Key, pyDes.CBC, Iv, pad=None, padmode=pyDes.PAD_PKCS5)
     k = base64.b64decode(data)
-    return method.decrypt(k)
+    return get_backend().decrypt(Key, Iv, k)
 
 def decrypt_content(res):
     accesskey=res.headers.get('Accesskey')
@@ -0,0 +1,60 @@
+# -*- coding: UTF-8 -*-
+"""
+EPUB公共部分
+EpubBook按阅读顺序一次算出清单、书脊和目录，EPUB2/EPUB3只负责序列化
+"""
+import re
+import zipfile
+
+
+_TAG = re.compile(r'</?\w+[^>]*>')
+
+MEDIA_TYPES = {'xhtml': 'application/xhtml+xml', 'jpg': 'image/jpeg'}
+
+
+class EpubBook:
+    """
+    一本EPUB中的文件与目录
+    """
+    def __init__(self, title, author, documents):
+        """
+        :param title: 书名
+        :param author: 作者
+        :param documents: [(文件名, 类型, 目录标题)]，按阅读顺序；类型为cover/info/volume/chapter/image
+        """
+        self.title = title
+        self.author = author
+        self.manifest = []  # (文件名, media-type)，全部文件
+        self.spine = []  # 卷标与章节文件
+        self.toc = []  # (类型, 文件名, 目录标题, 去掉标签的目录标题)，卷标与章节
+        for filename, kind, label in documents:
+            self.manifest.append((filename, MEDIA_TYPES[filename.rsplit('.', 1)[-1]]))
+            if kind in ('volume', 'chapter'):
+                self.spine.append(filename)
+                self.toc.append((kind, filename, label, _TAG.sub('', label)))
+
+
+class EpubSerializer:
+    """EPUB2/EPUB3共用的固定文件"""
+    csstext = ''
+
+    def create_mimetype(self, epub):
+        epub.writestr('mimetype', 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+
+    def create_container(self, epub):
+        container_info = '''<?xml version="1.0" encoding="UTF-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+</rootfiles></container>'''
+        epub.writestr('META-INF/container.xml', container_info, compress_type=zipfile.ZIP_STORED)
+
+    def create_stylesheet(self, epub):
+        epub.writestr('OEBPS/sgc-nav.css', self.csstext, compress_type=zipfile.ZIP_STORED)
+
+    def createEpub(self, epub, book):
+        """
+        写入元数据；mimetype与container在创建zip时写入，正文文件由调用方写入
+        :param epub: ZipFile
+        :param book: EpubBook
+        """
+        raise NotImplementedError
@@ -7,101 +7,636 @@ import requests
 import json
 import re
 import time
+import hashlib
+import random
+import threading
+import concurrent.futures
+from collections import deque, OrderedDict
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
 
 import DESCBC
 
 
+# 安卓API地址
+API_BASE = 'https://app.jjwxc.net/androidapi/'
+
+# 按host共享的Session（keep-alive连接池）
+_sessions = {}
+_adapters = []  # 所有挂载过的适配器，用于统计
+_session_lock = threading.Lock()
+_pool_size = 100
+# 异步引擎aiohttp会话的连接统计
+_async_pool_stats = {'opened': 0, 'requests': 0}
+
+# 按host的令牌桶限速（进程内所有下载共享）
+_buckets = {}
+
+# 小说信息、封面等后台请求共用的线程池
+_background_pool = None
+_background_lock = threading.Lock()
+BACKGROUND_WORKERS = 16
+
+# 接口响应缓存的默认有效期（秒）：期内直接使用，过期后带ETag/Last-Modified向服务器验证
+METADATA_TTL = {'novelbasicinfo': 3600, 'chapterList': 60}
+
+# 未指定时的请求超时（秒）
+DEFAULT_TIMEOUT = 30
+
+# 按host的熔断器及重试统计
+_breakers = {}
+_breaker_settings = {'threshold': 0.5, 'cooldown': 10.0, 'window': 50, 'min_requests': 20}
+_stats_lock = threading.Lock()
+_retry_stats = {'requests': 0, 'retries': 0, 'errors': 0, 'breaker_trips': 0}
+
+
 def get_headers():
     """获取请求头"""
-    return {"User-Agent": "Mobile " + time.asctime()}
+    return {"User-Agent": "Mobile " + time.asctime(), "Accept-Encoding": "gzip, deflate"}
 
 
-def fetch_novel_info(novel_id):
+def configure_pool(pool_size):
     """
-    获取小说基本信息和章节列表
-    :param novel_id: 小说ID
-    :return: (apicont, cdic, ress) 小说信息dict、章节列表list、网页解析结果
+    设置每个host的连接池大小，一般与下载线程数一致
+    只会增大：Session由进程内所有下载共享，已存在的Session换上更大的连接池，
+    原连接池不关闭，正在进行的请求照常完成，统计也继续累计
+    :param pool_size: 连接池大小
+    """
+    global _pool_size
+    pool_size = max(1, int(pool_size))
+    with _session_lock:
+        if pool_size <= _pool_size:
+            return
+        _pool_size = pool_size
+        for host, session in _sessions.items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+            # 直接替换已有前缀的适配器，不用mount，避免其他线程查找适配器时字典顺序被改动
+            session.adapters[host] = adapter
+            _adapters.append(adapter)
+
+
+def _host_key(url):
+    """url的协议+host部分"""
+    parts = urlsplit(url)
+    return parts.scheme + '://' + parts.netloc
+
+
+def get_session(url):
+    """
+    获取url所属host的共享Session
+    :param url: 请求地址
+    :return: requests.Session
+    """
+    host = _host_key(url)
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+    with _session_lock:
+        session = _sessions.get(host)
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_pool_size, pool_block=False)
+            session = requests.Session()
+            session.mount(host, adapter)
+            _adapters.append(adapter)
+            _sessions[host] = session
+    return session
+
+
+def get_pool_stats():
+    """
+    统计连接池使用情况
+    :return: dict，opened为新建连接数，reused为复用连接的请求数
+    """
+    opened = 0
+    requested = 0
+    with _session_lock:
+        adapters = list(_adapters)
+    for adapter in adapters:
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requested += pool.num_requests
+    with _stats_lock:
+        opened += _async_pool_stats['opened']
+        requested += _async_pool_stats['requests']
+    return {'opened': opened, 'reused': max(0, requested - opened), 'requests': requested}
+
+
+class TokenBucket:
+    """
+    令牌桶限速器
+    以rate个/秒的速度补充令牌，最多积攒burst个；
+    多个任务同时等待时按任务轮转发放令牌，避免大任务的大量线程挤占小任务
+    """
+    def __init__(self, rate=0, burst=1):
+        self.rate = 0.0
+        self.burst = 1.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._waiting = OrderedDict()  # job -> 等待中的请求数，队首优先
+        self._cond = threading.Condition()
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst):
+        """
+        :param rate: 每秒请求数，0表示不限速
+        :param burst: 突发上限
+        """
+        with self._cond:
+            self._refill()
+            self.rate = max(0.0, float(rate))
+            self.burst = max(1.0, float(burst))
+            self._tokens = min(self._tokens, self.burst) if self._waiting else self.burst
+            self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, job=None):
+        """
+        阻塞直到取得一个令牌
+        :param job: 任务标识，用于任务间轮转
+        """
+        if self.rate <= 0:
+            return
+        with self._cond:
+            self._waiting[job] = self._waiting.get(job, 0) + 1
+            try:
+                while self.rate > 0:
+                    self._refill()
+                    if self._tokens >= 1 and next(iter(self._waiting)) == job:
+                        self._tokens -= 1
+                        break
+                    if self._tokens >= 1:
+                        timeout = 0.05
+                    else:
+                        timeout = (1 - self._tokens) / self.rate
+                    self._cond.wait(timeout)
+            finally:
+                left = self._waiting.pop(job) - 1
+                if left:
+                    # 放到队尾，下一个令牌轮到其他任务
+                    self._waiting[job] = left
+                self._cond.notify_all()
+
+
+def configure_rate_limit(url, rate, burst):
+    """
+    设置url所属host的限速，对进程内所有下载生效
+    :param url: 该host下任意地址
+    :param rate: 每秒请求数，0表示不限速
+    :param burst: 突发上限
+    """
+    get_bucket(url).configure(rate, burst)
+
+
+def get_bucket(url):
+    """获取url所属host的令牌桶"""
+    host = _host_key(url)
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _session_lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket()
+                _buckets[host] = bucket
+    return bucket
+
+
+def http_get(url, job=None, **kwargs):
+    """
+    通过共享Session发送GET请求，受所属host的令牌桶限速
+    :param url: 请求地址
+    :param job: 任务标识，限速时用于任务间公平轮转
+    :return: requests.Response
+    """
+    get_bucket(url).acquire(job)
+    kwargs.setdefault('headers', get_headers())
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    return get_session(url).get(url, **kwargs)
+
+
+class RetryPolicy:
+    """章节请求重试策略：指数退避 + 随机抖动 + 单次请求超时"""
+    def __init__(self, max_attempts=100, base_delay=0.5, max_delay=30.0, timeout=15.0):
+        self.max_attempts = max_attempts  # 最多请求次数（含首次），与原先的100次一致
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, config):
+        """由DownloadConfig构建"""
+        return cls(config.retry_attempts, config.retry_base_delay,
+                   config.retry_max_delay, config.request_timeout)
+
+    def backoff(self, attempt):
+        """
+        第attempt次重试前的等待时间（full jitter）
+        :param attempt: 已失败次数，从1开始
+        :return: 秒
+        """
+        cap = min(self.max_delay, self.base_delay * (2 ** min(attempt - 1, 16)))
+        return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """
+    单个host的熔断器
+    最近window次请求的错误率超过threshold时熔断cooldown秒，期间所有请求等待
+    """
+    def __init__(self, threshold=0.5, cooldown=10.0, window=50, min_requests=20):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.min_requests = min_requests
+        self._outcomes = deque(maxlen=window)
+        self._open_until = 0.0
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """熔断剩余秒数，0表示可以请求"""
+        return max(0.0, self._open_until - time.monotonic())
+
+    def record(self, ok):
+        """记录一次请求结果"""
+        with self._lock:
+            self._outcomes.append(bool(ok))
+            if ok or not self.threshold or len(self._outcomes) < self.min_requests:
+                return
+            errors = self._outcomes.count(False)
+            if errors / len(self._outcomes) >= self.threshold:
+                self._open_until = time.monotonic() + self.cooldown
+                self._outcomes.clear()
+                _count('breaker_trips')
+
+
+def configure_breaker(threshold, cooldown):
+    """
+    设置熔断参数，对所有host生效
+    :param threshold: 触发熔断的错误率(0~1)，0表示关闭熔断
+    :param cooldown: 熔断持续秒数
+    """
+    with _session_lock:
+        _breaker_settings['threshold'] = threshold
+        _breaker_settings['cooldown'] = cooldown
+        for breaker in _breakers.values():
+            breaker.threshold = threshold
+            breaker.cooldown = cooldown
+
+
+def get_breaker(url):
+    """获取url所属host的熔断器"""
+    host = _host_key(url)
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _session_lock:
+            breaker = _breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(**_breaker_settings)
+                _breakers[host] = breaker
+    return breaker
+
+
+def _count(key, n=1):
+    with _stats_lock:
+        _retry_stats[key] += n
+
+
+def get_retry_stats():
+    """
+    章节请求的重试统计
+    :return: dict，requests请求数、retries重试数、errors失败数、breaker_trips熔断次数
+    """
+    with _stats_lock:
+        return dict(_retry_stats)
+
+
+def submit_background(fn, *args):
+    """
+    在共享的后台线程池中执行，用于与章节下载重叠的小请求
+    :return: concurrent.futures.Future
+    """
+    global _background_pool
+    if _background_pool is None:
+        with _background_lock:
+            if _background_pool is None:
+                _background_pool = concurrent.futures.ThreadPoolExecutor(
+                    BACKGROUND_WORKERS, thread_name_prefix='background'
+                )
+    return _background_pool.submit(fn, *args)
+
+
+def fetch_metadata(url, job=None, cache=None, ttl=0, valid=None):
+    """
+    获取JSON接口，可用cache.MetadataCache缓存：
+    有效期内直接使用缓存；过期后带If-None-Match/If-Modified-Since请求，304时沿用缓存；
+    服务器不支持条件请求时比较正文摘要，判断内容是否变化
+    :param url: 接口地址
+    :param job: 任务标识，用于限速时的任务间轮转
+    :param cache: MetadataCache，None则不缓存
+    :param ttl: 有效期（秒），0表示每次都向服务器验证
+    :param valid: 判断解析结果能否缓存的函数，None表示都可以
+    :return: 解析后的JSON
+    """
+    if cache is None:
+        return json.loads(http_get(url, job=job).text)
+
+    entry = cache.get(url)
+    if entry is not None and time.time() - entry['checked'] < ttl:
+        cache.count('fresh', len(entry['body'].encode('utf-8')))
+        return json.loads(entry['body'])
+
+    headers = get_headers()
+    if entry is not None:
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+    res = http_get(url, job=job, headers=headers)
+    if res.status_code == 304 and entry is not None:
+        cache.touch(url)
+        cache.count('revalidated', len(entry['body'].encode('utf-8')))
+        return json.loads(entry['body'])
+
+    data = json.loads(res.text)
+    digest = hashlib.sha1(res.content).hexdigest()
+    cache.count('unchanged' if entry is not None and entry['digest'] == digest else 'misses')
+    if res.status_code == 200 and (valid is None or valid(data)):
+        cache.put(url, res.text, res.headers.get('ETag', ''), res.headers.get('Last-Modified', ''), digest)
+    return data
+
+
+def fetch_web_page(novel_id, job=None):
+    """
+    获取并解析小说网页（只有特殊文案需要）
+    :return: lxml元素树
     """
     from lxml import etree
 
-    req_url = f'http://www.jjwxc.net/onebook.php?novelid={novel_id}'
-    apireq = f'https://app.jjwxc.net/androidapi/novelbasicinfo?novelId={novel_id}'
-    apivol = f'https://app.jjwxc.net/androidapi/chapterList?novelId={novel_id}&more=0&whole=1'
+    res = http_get(f'http://www.jjwxc.net/onebook.php?novelid={novel_id}', job=job)
+    try:
+        # 忽略无法解码的字节，按字节解析时遇到坏字节会截断页面
+        return etree.HTML(res.content.decode('GB18030', 'ignore'))
+    finally:
+        res.close()
+
 
-    # 获取网页信息（用于特殊文案获取）
-    res = requests.get(req_url, headers=get_headers())
-    ress = etree.HTML(res.content.decode("GB18030", "ignore").encode("utf-8", "ignore").decode('utf-8'))
-    res.close()
+def fetch_novel_info(novel_id, job=None, web_page=True, cache=None, ttl=None):
+    """
+    获取小说基本信息和章节列表，各请求同时进行
+    :param novel_id: 小说ID
+    :param job: 任务标识，用于限速时的任务间轮转
+    :param web_page: 是否获取网页（用于特殊文案），False时ress为None
+    :param cache: MetadataCache，缓存小说信息与章节列表，None则不缓存
+    :param ttl: {接口名: 有效期(秒)}，覆盖METADATA_TTL
+    :return: (apicont, cdic, ress) 小说信息dict、章节列表list、网页解析结果
+    """
+    apireq = f'{API_BASE}novelbasicinfo?novelId={novel_id}'
+    apivol = f'{API_BASE}chapterList?novelId={novel_id}&more=0&whole=1'
+    ttl = dict(METADATA_TTL, **(ttl or {}))
 
-    # 获取API信息
-    apires = requests.get(apireq, headers=get_headers())
-    apicont = json.loads(apires.text)
+    page = submit_background(fetch_web_page, novel_id, job) if web_page else None
+    basic = submit_background(
+        fetch_metadata, apireq, job, cache, ttl['novelbasicinfo'],
+        lambda d: "novelIntro" in d or "message" not in d
+    )
+    chapters = submit_background(
+        fetch_metadata, apivol, job, cache, ttl['chapterList'], lambda d: "chapterlist" in d
+    )
 
+    apicont = basic.result()
+    ress = page.result() if page is not None else None
     if "message" in apicont and "novelIntro" not in apicont:
         return apicont, None, ress
 
-    # 获取章节列表
-    rc = requests.get(apivol, headers=get_headers())
-    cdic = json.loads(rc.text)
-    cdic = cdic["chapterlist"]
-
+    cdic = chapters.result()["chapterlist"]
     return apicont, cdic, ress
 
 
-def fetch_chapter_content(chapter_url, token):
-    """
-    获取并解密单个章节的原始内容
-    :param chapter_url: 章节API URL
-    :param token: 用户token
-    :return: dict with keys: content, sayBody, upDown, message, chapterSize, chapterDate
-             content已解密，如果获取失败则content为空字符串
-    """
-    full_url = chapter_url + '&versionCode=349&token=' + token
+class RawResponse:
+    """响应的最小封装，供DESCBC.decrypt_content使用（兼容requests与aiohttp）"""
+    def __init__(self, text, headers, status_code=200):
+        self.text = text
+        self.headers = headers
+        self.status_code = status_code
 
-    result = {
+
+def new_chapter_result():
+    """章节结果dict模板"""
+    return {
         'content': '',
         'sayBody': '',
         'upDown': '',
         'message': '',
         'chapterSize': '',
         'chapterDate': '',
+        'retries': 0,
     }
 
-    badgateway = True
-    retry = 100
 
-    while badgateway and retry > 0:
-        chcot = requests.get(full_url, headers=get_headers())
+def chapter_full_url(chapter_url, token):
+    """拼接带token的章节请求地址"""
+    return chapter_url + '&versionCode=349&token=' + token
+
+
+def decrypt_chapter(result):
+    """
+    解密parse_chapter_response(decrypt=False)留下的正文密文，原地修改并返回result
+    :param result: 章节结果dict
+    :return: result
+    """
+    if result.pop('encrypted', False):
+        tex = DESCBC.decrypt_str(result['content']).decode('utf-8')
+        result['content'] = re.sub('&lt;br&gt;', '\n', tex)
+    return result
+
+
+def parse_chapter_response(response, result, decrypt=True):
+    """
+    解析章节接口响应并写入result
+    :param response: 含text、headers属性的响应对象
+    :param result: new_chapter_result()返回的dict
+    :param decrypt: 是否立即解密正文；False时保留密文并置encrypted标记，稍后由decrypt_chapter解密
+    :return: 是否结束（成功或未购买），False表示需要重试
+    """
+    try:
+        chcont = json.loads(response.text)
+    except Exception:
+        chcont = json.loads(DESCBC.decrypt_content(response))
+
+    if 'message' not in chcont.keys():
+        result['content'] = chcont['content']
+        result['encrypted'] = True
+        if decrypt:
+            decrypt_chapter(result)
+        result['sayBody'] = chcont.get('sayBody', '')
+        result['upDown'] = chcont.get('upDown', '')
+        result['chapterSize'] = chcont.get('chapterSize', '')
+        result['chapterDate'] = chcont.get('chapterDate', '')
+        result['message'] = ''
+        return True
+
+    result['message'] = chcont["message"]
+    return needs_purchase(chcont["message"])
+
+
+def needs_purchase(message):
+    """章节接口的提示是否为未购买（重试无用）"""
+    return bool(re.findall('用晋江币购买章节后即可阅读', message))
+
+
+def fetch_chapter_content(chapter_url, token, policy=None, job=None, decrypt=True):
+    """
+    获取并解密单个章节的原始内容
+    :param chapter_url: 章节API URL
+    :param token: 用户token
+    :param policy: RetryPolicy，None使用默认策略
+    :param job: 任务标识，用于限速时的任务间轮转
+    :param decrypt: False时正文保持密文，交由decrypt_chapter在别处解密
+    :return: dict with keys: content, sayBody, upDown, message, chapterSize, chapterDate, retries
+             content已解密，如果获取失败则content为空字符串
+    """
+    policy = policy or RetryPolicy()
+    breaker = get_breaker(chapter_url)
+    full_url = chapter_full_url(chapter_url, token)
+    result = new_chapter_result()
+
+    attempt = 0
+    while True:
+        wait = breaker.remaining()
+        if wait > 0:
+            time.sleep(wait)
+        _count('requests')
+        try:
+            chcot = http_get(full_url, job=job, timeout=policy.timeout)
+            done = parse_chapter_response(chcot, result, decrypt)
+        except Exception as e:
+            result['message'] = f'请求失败：{e!r}'
+            done = False
+        breaker.record(done)
+        if done:
+            break
+        _count('errors')
+        attempt += 1
+        if attempt >= policy.max_attempts:
+            break
+        _count('retries')
+        time.sleep(policy.backoff(attempt))
+
+    result['retries'] = attempt
+    return result
+
+
+def aiohttp_available():
+    """是否安装了aiohttp（异步引擎依赖）"""
+    try:
+        import aiohttp  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_async_session(pool_size):
+    """
+    创建异步引擎使用的aiohttp会话，需在事件循环内调用
+    :param pool_size: 每个host的最大连接数
+    :return: aiohttp.ClientSession
+    """
+    import aiohttp
+
+    async def on_connection_create(session, context, params):
+        with _stats_lock:
+            _async_pool_stats['opened'] += 1
+
+    async def on_request_start(session, context, params):
+        with _stats_lock:
+            _async_pool_stats['requests'] += 1
+
+    # 新建连接与请求数计入get_pool_stats，与线程引擎的连接池统计一致
+    trace = aiohttp.TraceConfig()
+    trace.on_connection_create_end.append(on_connection_create)
+    trace.on_request_start.append(on_request_start)
+    connector = aiohttp.TCPConnector(limit=0, limit_per_host=max(1, int(pool_size)))
+    return aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+
+
+async def http_get_async(session, url, job=None, **kwargs):
+    """
+    http_get的协程版本：通过异步会话发送GET请求，受所属host的令牌桶限速
+    :param session: create_async_session返回的会话
+    :param url: 请求地址
+    :param job: 任务标识，限速时用于任务间公平轮转
+    :return: RawResponse
+    """
+    import asyncio
+    import aiohttp
+
+    bucket = get_bucket(url)
+    if bucket.rate > 0:
+        # 令牌桶与线程引擎共享，等待放到线程中避免阻塞事件循环
+        await asyncio.to_thread(bucket.acquire, job)
+    kwargs.setdefault('headers', get_headers())
+    kwargs['timeout'] = aiohttp.ClientTimeout(total=kwargs.get('timeout') or DEFAULT_TIMEOUT)
+    async with session.get(url, **kwargs) as resp:
+        text = await resp.text(errors='ignore')
+        return RawResponse(text, resp.headers, resp.status)
+
+
+async def fetch_chapter_content_async(session, chapter_url, token, policy=None, job=None,
+                                      decrypt=True):
+    """
+    fetch_chapter_content的协程版本
+    :param session: create_async_session返回的会话
+    :param chapter_url: 章节API URL
+    :param token: 用户token
+    :param policy: RetryPolicy，None使用默认策略
+    :param job: 任务标识，用于限速时的任务间轮转
+    :param decrypt: 同fetch_chapter_content
+    :return: 同fetch_chapter_content
+    """
+    import asyncio
+
+    policy = policy or RetryPolicy()
+    breaker = get_breaker(chapter_url)
+    full_url = chapter_full_url(chapter_url, token)
+    result = new_chapter_result()
+
+    attempt = 0
+    while True:
+        wait = breaker.remaining()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        _count('requests')
         try:
-            chcont = json.loads(chcot.text)
-        except:
-            chcont = json.loads(DESCBC.decrypt_content(chcot))
-
-        if 'message' not in chcont.keys():
-            tex = chcont['content']
-            tex = DESCBC.decrypt_str(tex).decode('utf-8')
-            tex = re.sub('&lt;br&gt;', '\n', tex)
-
-            result['content'] = tex
-            result['sayBody'] = chcont.get('sayBody', '')
-            result['upDown'] = chcont.get('upDown', '')
-            result['chapterSize'] = chcont.get('chapterSize', '')
-            result['chapterDate'] = chcont.get('chapterDate', '')
-            badgateway = False
-        else:
-            result['message'] = chcont["message"]
-            if re.findall('用晋江币购买章节后即可阅读', chcont["message"]):
-                badgateway = False
-            else:
-                retry -= 1
+            chcot = await http_get_async(session, full_url, job=job, timeout=policy.timeout)
+            done = parse_chapter_response(chcot, result, decrypt)
+        except Exception as e:
+            result['message'] = f'请求失败：{e!r}'
+            done = False
+        breaker.record(done)
+        if done:
+            break
+        _count('errors')
+        attempt += 1
+        if attempt >= policy.max_attempts:
+            break
+        _count('retries')
+        await asyncio.sleep(policy.backoff(attempt))
 
+    result['retries'] = attempt
     return result
 
 
-def download_cover(cover_url):
+def download_cover(cover_url, cache=None):
     """
     下载封面图片
     :param cover_url: 封面URL
+    :param cache: cache.CoverCache，命中时不再请求，None则不缓存
     :return: 图片二进制数据或None
     """
     if not cover_url:
@@ -110,8 +645,15 @@ def download_cover(cover_url):
     if re.findall(r'i9-static.jjwxc.net', cover_url):
         return None
 
+    if cache is not None:
+        data = cache.get(cover_url)
+        if data is not None:
+            return data
     try:
-        pres = requests.get(cover_url)
-        return pres.content
+        pres = http_get(cover_url)
+        data = pres.content
     except Exception:
         return None
+    if cache is not None and pres.status_code == 200 and data:
+        cache.put(cover_url, data)
+    return data
@@ -12,7 +12,7 @@ from functools import partial
 from nicegui import ui, app
 
 from models import DownloadConfig
-from downloader import NovelDownloader
+from downloader import NovelDownloader, configure_network, network_config
 
 
 # ============================================================
@@ -173,10 +173,13 @@ def create_page():
         """追加日志"""
         log_area.push(msg)
 
-    def update_progress(pct, current, total):
+    def update_progress(pct, current, total, concurrency=None):
         """更新进度"""
         progress.set_value(pct / 100)
-        progress_label.set_text(f'{current}/{total} ({pct}%)')
+        text = f'{current}/{total} ({pct}%)'
+        if concurrency:
+            text += f'  并发：{concurrency}'
+        progress_label.set_text(text)
 
     # ============================================================
     # 保存配置
@@ -272,7 +275,7 @@ def create_page():
                 ui.notify(f'下载失败：{error}', type='negative')
                 progress_label.set_text(f'失败：{error}')
 
-            if downloader.percent < len(downloader.chapter_data.href_list if downloader.chapter_data else []):
+            if downloader.percent < len(downloader.chapter_data or []):
                 ui.notify('部分章节下载失败，请检查token', type='warning')
         except Exception as e:
             ui.notify(f'下载出错：{str(e)}', type='negative')
@@ -294,4 +297,6 @@ def index():
 
 
 if __name__ in {"__main__", "__mp_main__"}:
+    # 熔断与限速由页面中的所有下载共享，启动时设置一次
+    configure_network(network_config(load_config()))
     ui.run(title='晋江小说下载器', port=8080, reload=False)
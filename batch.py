@@ -0,0 +1,292 @@
+# -*- coding: UTF-8 -*-
+"""
+批量下载模块
+多部小说共用一个有界的章节线程池：按优先级调度，同一优先级的小说轮流获取章节，
+大部头不会让后面的短篇一直排队，总并发也不会随小说数增长
+"""
+import copy
+import json
+import time
+import threading
+import concurrent.futures
+from collections import deque
+
+from downloader import NovelDownloader, configure_network
+from limiter import AdaptiveLimiter
+from models import DownloadConfig
+
+
+class FairScheduler:
+    """
+    共享的章节工作线程池
+    优先级高的作业先执行；同一优先级内每个作业排一个队，工作线程轮流从各队取任务
+    """
+    def __init__(self, max_workers, adaptive=True):
+        """
+        :param max_workers: 工作线程数，即所有小说合计的并发上限
+        :param adaptive: 是否用AIMD自适应限制实际并发
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.limiter = AdaptiveLimiter(self.max_workers) if adaptive else None
+        self.completed = 0  # 已完成的任务数
+        self._cond = threading.Condition()
+        self._queues = {}  # 作业 -> 待执行任务
+        self._rings = {}  # 优先级 -> 有待执行任务的作业，轮流取任务
+        self._priority = {}  # 作业 -> 优先级
+        self._closed = False
+        self._threads = []
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._worker, name=f'batch-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def set_priority(self, job, priority):
+        """设置作业的优先级，需在提交任务前调用"""
+        with self._cond:
+            self._priority[job] = priority
+
+    def forget(self, job):
+        """作业结束后清除其记录"""
+        with self._cond:
+            self._priority.pop(job, None)
+
+    def submit(self, job, fn, *args):
+        """
+        提交一个任务
+        :param job: 作业标识（通常为NovelDownloader实例）
+        :param fn: 任务函数
+        :return: concurrent.futures.Future
+        """
+        future = concurrent.futures.Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('调度器已关闭')
+            queue = self._queues.get(job)
+            if queue is None:
+                queue = self._queues[job] = deque()
+            if not queue:
+                self._rings.setdefault(self._priority.get(job, 0), deque()).append(job)
+            queue.append((future, fn, args))
+            self._cond.notify()
+        return future
+
+    def _next(self):
+        """取下一个任务：最高优先级中轮到的作业的第一个任务"""
+        priority = max(p for p, ring in self._rings.items() if ring)
+        ring = self._rings[priority]
+        job = ring.popleft()
+        queue = self._queues[job]
+        task = queue.popleft()
+        if queue:
+            ring.append(job)
+        else:
+            del self._queues[job]
+        return task
+
+    def _has_tasks(self):
+        return any(self._rings.values())
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._has_tasks())
+                if not self._has_tasks():
+                    return
+                future, fn, args = self._next()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            with self._cond:
+                self.completed += 1
+
+    def shutdown(self):
+        """执行完已提交的任务后结束工作线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+
+class BatchJob:
+    """批量下载中的一部小说"""
+    def __init__(self, url, config=None, priority=0):
+        """
+        :param url: 小说网址
+        :param config: DownloadConfig，None使用批量下载的默认配置
+        :param priority: 优先级，越大越先获取章节
+        """
+        self.url = url
+        self.config = config
+        self.priority = priority
+        self.status = 'pending'  # pending, running, done, failed
+        self.output_file = None
+        self.error = None
+        self.chapters = 0  # 已完成章节数
+        self.total = 0  # 章节总数
+        self.failed = []  # 未购买或加载失败的章节ID
+        self.started = None
+        self.finished = None
+
+
+def parse_job(line, base_config=None):
+    """
+    解析任务列表中的一行
+    普通行为小说网址；以{开头的行为JSON，url为网址，priority为优先级，其余键覆盖DownloadConfig的同名字段
+    :param line: 文本行
+    :param base_config: 默认配置
+    :return: BatchJob，空行或#开头的注释返回None
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    config = copy.copy(base_config) if base_config else DownloadConfig()
+    if not line.startswith('{'):
+        return BatchJob(line, config)
+    data = json.loads(line)
+    url = data.pop('url')
+    priority = int(data.pop('priority', 0))
+    for key, value in data.items():
+        if not hasattr(config, key):
+            raise ValueError(f'未知的配置项：{key}')
+        setattr(config, key, value)
+    return BatchJob(url, config, priority)
+
+
+def load_jobs(path, base_config=None):
+    """
+    读取任务列表文件
+    :param path: 文件路径，每行一部小说，格式见parse_job
+    :param base_config: 默认配置
+    :return: [BatchJob]
+    """
+    jobs = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            job = parse_job(line, base_config)
+            if job is not None:
+                jobs.append(job)
+    return jobs
+
+
+class BatchDownloader:
+    """批量下载编排器"""
+
+    def __init__(self, config=None, max_workers=100, max_jobs=8, adaptive=True,
+                 progress_callback=None, log_callback=None):
+        """
+        :param config: 未单独指定配置的小说使用的DownloadConfig
+        :param max_workers: 章节线程数，所有小说共用
+        :param max_jobs: 同时进行的小说数（获取信息、写文件等每部小说占一个线程）
+        :param adaptive: 是否用AIMD自适应限制章节并发
+        :param progress_callback: 进度回调 (job, percent, current, total)
+        :param log_callback: 日志回调 (message)
+        """
+        self.config = config or DownloadConfig()
+        self.max_workers = max_workers
+        self.max_jobs = max(1, max_jobs)
+        self.adaptive = adaptive
+        self.progress_callback = progress_callback
+        self.log_callback = log_callback
+        self.jobs = []
+        self.scheduler = None
+        self._started = None
+
+    def _log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def add(self, url, config=None, priority=0):
+        """
+        添加一部小说
+        :return: BatchJob
+        """
+        job = BatchJob(url, config, priority)
+        self.jobs.append(job)
+        return job
+
+    def load(self, path):
+        """
+        从任务列表文件添加小说，格式见parse_job
+        :return: [BatchJob]
+        """
+        jobs = load_jobs(path, self.config)
+        self.jobs.extend(jobs)
+        return jobs
+
+    def stats(self):
+        """
+        :return: dict，jobs总数、done成功、failed失败、running进行中、chapters已完成章节（含续传跳过的）、
+                 fetched共享线程池处理的章节、elapsed耗时(秒)、rate每秒处理章节数
+        """
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        fetched = self.scheduler.completed if self.scheduler else 0
+        return {
+            'jobs': len(self.jobs),
+            'done': sum(job.status == 'done' for job in self.jobs),
+            'failed': sum(job.status == 'failed' for job in self.jobs),
+            'running': sum(job.status == 'running' for job in self.jobs),
+            'chapters': sum(job.chapters for job in self.jobs),
+            'fetched': fetched,
+            'elapsed': elapsed,
+            'rate': fetched / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _run_job(self, job):
+        job.status = 'running'
+        job.started = time.monotonic()
+        config = job.config or copy.copy(self.config)
+        name = job.url.split('=')[-1]
+
+        def on_progress(pct, current, total, concurrency=None):
+            job.chapters = current
+            job.total = total
+            if self.progress_callback:
+                self.progress_callback(job, pct, current, total)
+
+        downloader = NovelDownloader(
+            config, on_progress, lambda m: self._log(f'[{name}] {m}'), self.scheduler
+        )
+        self.scheduler.set_priority(downloader, job.priority)
+        try:
+            success, job.output_file, job.error = downloader.download_novel(job.url, self.max_workers)
+        except Exception as e:
+            success = False
+            job.error = str(e)
+        finally:
+            self.scheduler.forget(downloader)
+        job.chapters = downloader.percent
+        job.failed = sorted(downloader.fail_info)
+        job.status = 'done' if success else 'failed'
+        job.finished = time.monotonic()
+        elapsed = job.finished - job.started
+        if success:
+            self._log(f'[{name}] 完成：{job.output_file}，{job.chapters}章，用时{elapsed:.1f}秒')
+        else:
+            self._log(f'[{name}] 失败：{job.error}')
+
+    def run(self):
+        """
+        下载全部小说，优先级高的先开始，直到全部结束
+        :return: [BatchJob]
+        """
+        self._started = time.monotonic()
+        configure_network(self.config)
+        self.scheduler = FairScheduler(self.max_workers, self.adaptive)
+        pending = sorted(self.jobs, key=lambda job: -job.priority)
+        self._log(f'批量下载：{len(pending)}部小说，章节线程{self.max_workers}，同时进行{self.max_jobs}部')
+        try:
+            with concurrent.futures.ThreadPoolExecutor(self.max_jobs) as executor:
+                list(executor.map(self._run_job, pending))
+        finally:
+            self.scheduler.shutdown()
+
+        stats = self.stats()
+        self._log(f"批量下载结束：成功{stats['done']}部，失败{stats['failed']}部，"
+                  f"共{stats['chapters']}章，用时{stats['elapsed']:.1f}秒，{stats['rate']:.1f}章/秒")
+        return self.jobs
@@ -0,0 +1,67 @@
+# -*- coding: UTF-8 -*-
+"""
+DES解密后端基准测试
+fixtures/chapter_responses.json为章节接口格式的响应（Accesskey、Keystring响应头与整体加密的正文），
+按下载时的路径解析：DESCBC.decrypt_content解开响应，再用decrypt_str解密章节正文；
+比较各后端的耗时，并校验各后端结果完全一致、正文与记录的摘要相符
+用法：python benchmarks/bench_descbc.py [重复次数]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api
+import DESCBC
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'chapter_responses.json')
+
+
+def load_responses():
+    """
+    :return: [(RawResponse, 正文md5)]
+    """
+    with open(FIXTURES, encoding='utf-8') as f:
+        return [(api.RawResponse(r['text'], r['headers']), r['content_md5']) for r in json.load(f)]
+
+
+def parse(response):
+    """与下载时相同的解析流程，返回解密后的章节结果"""
+    result = api.new_chapter_result()
+    if not api.parse_chapter_response(response, result):
+        raise SystemExit(f"响应解析失败：{result['message']}")
+    return result
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    responses = load_responses()
+    print(f'{len(responses)}个响应，重复{repeat}次')
+
+    # pyDes放在首位作为基准
+    names = sorted(DESCBC.available_backends(), key=lambda n: n != 'pyDes')
+    baseline = None
+    expected = None
+    for name in names:
+        DESCBC.set_backend(name)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = [parse(response) for response, _ in responses]
+        elapsed = time.perf_counter() - start
+        for result, (_, digest) in zip(results, responses):
+            if hashlib.md5(result['content'].encode('utf-8')).hexdigest() != digest:
+                raise SystemExit(f'{name}：正文与记录的摘要不符')
+        if expected is None:
+            expected = results
+        elif results != expected:
+            raise SystemExit(f'{name}：解密结果与pyDes不一致')
+        baseline = baseline or elapsed
+        per = elapsed * 1000 / (repeat * len(responses))
+        print(f'{name:>14}: {per:8.2f} ms/响应  {baseline / elapsed:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
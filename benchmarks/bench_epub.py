@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+"""
+EPUB打包基准测试
+用合成章节测量写入章节和生成元数据的耗时，每章耗时应不随章节数增长；
+并对比不同压缩级别与压缩线程数
+用法：python benchmarks/bench_epub.py [章节数 ...]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import output
+from models import DownloadConfig, ChapterData, ChapterRecord
+
+
+def build(count, fmt, tmpdir, level=6, workers=0):
+    config = DownloadConfig()
+    config.format_type = fmt
+    config.compress_level = level
+    config.compress_workers = workers
+    data = ChapterData()
+    for i in range(1, count + 1):
+        data.add(ChapterRecord(str(i), '', f'第{i}章', '内容提要'))
+        if i % 50 == 1:
+            data.roll_sign.append(f'§ 第{i // 50 + 1}卷 §')
+            data.roll_sign_place.append(str(i))
+    data.index = [f'{c.chapter_id} {c.title} {c.summary}' for c in data.chapters]
+    filenames = output.chapter_filenames(data, config)
+    body = ''.join(f'<p>第{i}段，{i * 7919 % 10007}号正文内容。</p>\n' for i in range(200))
+
+    path = os.path.join(tmpdir, f'{fmt}-{count}-{level}-{workers}.epub')
+    start = time.perf_counter()
+    writer = output.create_epub(path, config)
+    output.save_volume_files(data, config, writer)
+    writer.write('info.xhtml', '<html/>')
+    for c in data.chapters:
+        writer.write(filenames[c.chapter_id], output.chapter_document(c.title, body, config))
+    written = time.perf_counter()
+    writer.close('作者', '书名', data, filenames)
+    end = time.perf_counter()
+    return written - start, end - written, os.path.getsize(path)
+
+
+def main():
+    counts = [int(a) for a in sys.argv[1:]] or [500, 2000, 8000]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for fmt in ('epub2', 'epub3'):
+            for count in counts:
+                chapters, meta, _ = build(count, fmt, tmpdir)
+                print(f'{fmt} {count:>6}章: 章节 {chapters * 1000:8.1f} ms'
+                      f'  元数据 {meta * 1000:7.1f} ms  每章 {(chapters + meta) / count * 1e6:6.0f} us')
+
+        count = counts[-1]
+        print(f'\nepub3 {count}章，压缩级别/线程数：')
+        for level in (0, 1, 6, 9):
+            for workers in sorted({1, os.cpu_count() or 1}):
+                chapters, meta, size = build(count, 'epub3', tmpdir, level, workers)
+                print(f'级别{level} {workers:>2}线程: {(chapters + meta) * 1000:8.1f} ms  {size / 1048576:6.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
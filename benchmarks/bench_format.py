@@ -0,0 +1,40 @@
+# -*- coding: UTF-8 -*-
+"""
+章节格式化基准测试：比较改写前后的实现处理超长章节的速度
+输出一致性由tests/test_chapter_format.py检查
+用法：python benchmarks/bench_format.py [长章节字数]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chapter
+from models import DownloadConfig
+from tests.test_chapter_format import legacy_format_content
+
+
+def bench(size):
+    """超长章节的处理耗时"""
+    line = '　　晋江文学城章节正文&lt;b&gt;样本 @无限好文，尽在晋江文学城 ，包含标点和English。\n\n'
+    raw = {'content': line * (size // len(line) + 1), 'sayBody': '作者的话\n' * 50, 'upDown': 1,
+           'message': '', 'chapterSize': '1', 'chapterDate': '2024-01-01'}
+    for fmt in ('txt', 'epub3'):
+        config = DownloadConfig()
+        config.format_type = fmt
+        for label, func in (('旧实现', legacy_format_content), ('新实现', chapter.format_content)):
+            start = time.perf_counter()
+            for _ in range(5):
+                func('1 标题', raw, config, 4)
+            elapsed = (time.perf_counter() - start) / 5
+            print(f'{fmt:>5} {label}: {elapsed * 1000:8.1f} ms/章  {len(raw["content"]) / elapsed / 1e6:6.2f} M字/秒')
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    bench(size)
+
+
+if __name__ == '__main__':
+    main()
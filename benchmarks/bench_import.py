@@ -0,0 +1,99 @@
+# -*- coding: UTF-8 -*-
+"""
+启动耗时基准测试
+在新进程中用 -X importtime 测量导入命令行版与下载器的耗时（不含解释器自身启动），取中位数；
+并检查只生成txt、不做繁简转换时没有加载Pillow、OpenCC、lxml、EPUB模块和界面库
+超出预算或加载了不需要的模块时以退出码1结束，可放在持续集成中防止启动变慢
+用法：python benchmarks/bench_import.py [预算毫秒] [次数]
+"""
+import os
+import sys
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = 'import cli, downloader'
+
+# 只生成txt、不做繁简转换时不应加载的模块
+HEAVY = ('PIL', 'opencc', 'lxml', 'EPUB', 'EPUB2', 'EPUB3', 'zipwriter', 'asyncio', 'aiohttp',
+         'nicegui', 'tkinter', 'ttkbootstrap')
+
+# 走一遍txt输出的准备流程，再列出加载了的重模块
+TXT_SCRIPT = '''
+import os, sys, tempfile
+import cli, downloader, output, utils
+from models import DownloadConfig, ChapterData, ChapterRecord
+config = DownloadConfig()
+data = ChapterData()
+for i in range(1, 4):
+    data.add(ChapterRecord(str(i), '', '第' + str(i) + '章'))
+filenames = output.chapter_filenames(data, config)
+utils.convert_text('文本', config.state)
+with tempfile.TemporaryDirectory() as tmpdir:
+    writer = output.create_txt(os.path.join(tmpdir, 'a.txt'), data, filenames, config)
+    output.save_volume_files(data, config, writer)
+    for c in data.chapters:
+        writer.write(filenames[c.chapter_id], output.chapter_document(c.title, '正文', config))
+    writer.close()
+print(' '.join(m for m in %r if m in sys.modules))
+''' % (HEAVY,)
+
+
+def import_times(code):
+    """
+    :return: {顶层模块: 累计导入耗时(微秒)}
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith(' ' * 2):  # 只统计顶层导入，子模块已计入其累计耗时
+            times[name.strip()] = times.get(name.strip(), 0) + int(cumulative)
+    return times
+
+
+def measure(runs):
+    """
+    :return: 每次导入IMPORTS的耗时(毫秒)，扣除解释器启动时就会导入的模块
+    """
+    startup = set(import_times('pass'))
+    samples = []
+    for _ in range(runs):
+        times = import_times(IMPORTS)
+        samples.append(sum(t for name, t in times.items() if name not in startup) / 1000)
+    return samples
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 200.0
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    ok = True
+
+    samples = measure(runs)
+    median = statistics.median(samples)
+    print(f'{IMPORTS}: 中位数 {median:.1f} ms（{runs}次，最快 {min(samples):.1f} ms），预算 {budget:.0f} ms')
+    if median > budget:
+        print('超出启动耗时预算')
+        ok = False
+
+    loaded = subprocess.run([sys.executable, '-c', TXT_SCRIPT], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout.split()
+    if loaded:
+        print(f'txt下载不应加载：{" ".join(loaded)}')
+        ok = False
+    else:
+        print('txt下载未加载Pillow、OpenCC、lxml、EPUB模块与界面库')
+
+    startup = set(import_times('pass'))
+    top = sorted(((name, t) for name, t in import_times(IMPORTS).items() if name not in startup),
+                 key=lambda x: -x[1])[:8]
+    print('耗时最多的顶层导入：' + '，'.join(f'{name} {t / 1000:.1f}ms' for name, t in top))
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
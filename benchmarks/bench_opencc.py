@@ -0,0 +1,39 @@
+# -*- coding: UTF-8 -*-
+"""
+繁简转换基准测试
+对比每次新建OpenCC与复用缓存转换器
+用法：python benchmarks/bench_opencc.py [标题数]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from opencc import OpenCC
+import utils
+
+
+def timed(label, func, baseline=None):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    ratio = f'{baseline / elapsed:6.1f}x' if baseline else '   1.0x'
+    print(f'{label:>10}: {elapsed * 1000:9.1f} ms  {ratio}')
+    return result, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    titles = [f'{i} 第{i}章 後來他們說話間發現頭髮乾了 內容提要：著名的台灣麵條' for i in range(count)]
+    print(f'{count}个标题，繁转简')
+
+    old, base = timed('每次新建', lambda: [OpenCC('t2s').convert(t) for t in titles])
+    utils.get_converter('s')  # 词典加载计入首次调用，此处预热
+    cached, _ = timed('缓存', lambda: [utils.convert_text(t, 's') for t in titles], base)
+    if old != cached:
+        raise SystemExit('转换结果不一致')
+
+
+if __name__ == '__main__':
+    main()
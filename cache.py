@@ -0,0 +1,343 @@
+# -*- coding: UTF-8 -*-
+"""
+本地缓存模块
+用SQLite保存已解密的章节内容，重复导出同一小说时无需再次请求；
+以及小说信息、章节列表等接口的响应，供有效期内复用和条件请求验证；
+封面图片按网址缓存为文件
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+# 进程内按路径共享的缓存实例
+_caches = {}
+_metadata_caches = {}
+_cover_caches = {}
+_caches_lock = threading.Lock()
+
+
+class ChapterCache:
+    """
+    章节内容缓存
+    以(小说ID, 章节ID)为键，章节列表元数据指纹不一致时视为失效；
+    总大小超过max_bytes时按最近访问时间淘汰
+    """
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        """
+        :param path: 数据库文件路径
+        :param max_bytes: 缓存内容总大小上限
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS chapters (
+            novel_id TEXT NOT NULL,
+            chapter_id TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            data TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            accessed REAL NOT NULL,
+            PRIMARY KEY (novel_id, chapter_id))''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS chapters_accessed ON chapters (accessed)')
+        self._conn.commit()
+        row = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM chapters').fetchone()
+        self._total = row[0]
+
+    def get(self, novel_id, chapter_id, fingerprint):
+        """
+        读取缓存的章节
+        :param novel_id: 小说ID
+        :param chapter_id: 章节ID
+        :param fingerprint: 章节列表中该章的元数据指纹
+        :return: api.fetch_chapter_content格式的dict，未命中返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT fingerprint, data FROM chapters WHERE novel_id=? AND chapter_id=?',
+                (novel_id, chapter_id)).fetchone()
+            if row is None or row[0] != fingerprint:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                'UPDATE chapters SET accessed=? WHERE novel_id=? AND chapter_id=?',
+                (time.time(), novel_id, chapter_id))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[1])
+
+    def put(self, novel_id, chapter_id, fingerprint, result):
+        """
+        写入章节，仅缓存成功获取的内容
+        :param novel_id: 小说ID
+        :param chapter_id: 章节ID
+        :param fingerprint: 章节列表中该章的元数据指纹
+        :param result: api.fetch_chapter_content返回的dict
+        """
+        if not result.get('content'):
+            return
+        data = json.dumps({
+            'content': result['content'],
+            'sayBody': result.get('sayBody', ''),
+            'upDown': result.get('upDown', ''),
+            'chapterSize': result.get('chapterSize', ''),
+            'chapterDate': result.get('chapterDate', ''),
+        }, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+
+        with self._lock:
+            old = self._conn.execute(
+                'SELECT size FROM chapters WHERE novel_id=? AND chapter_id=?',
+                (novel_id, chapter_id)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO chapters VALUES (?, ?, ?, ?, ?, ?)',
+                (novel_id, chapter_id, fingerprint, data, size, time.time()))
+            self._total += size - (old[0] if old else 0)
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰到上限的90%"""
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute(
+            'SELECT novel_id, chapter_id, size FROM chapters ORDER BY accessed').fetchall()
+        for novel_id, chapter_id, size in rows:
+            if self._total <= target:
+                break
+            self._conn.execute(
+                'DELETE FROM chapters WHERE novel_id=? AND chapter_id=?', (novel_id, chapter_id))
+            self._total -= size
+
+    def stats(self):
+        """
+        :return: dict，hits命中数、misses未命中数、bytes缓存大小
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'bytes': self._total}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_chapter_cache(path, max_bytes):
+    """
+    获取路径对应的共享缓存实例
+    :param path: 数据库文件路径
+    :param max_bytes: 缓存内容总大小上限
+    :return: ChapterCache
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = ChapterCache(path, max_bytes)
+            _caches[path] = cache
+        cache.max_bytes = max_bytes
+        return cache
+
+
+class MetadataCache:
+    """
+    接口响应缓存
+    以URL为键保存响应正文、ETag、Last-Modified和正文摘要，由api.fetch_metadata决定何时复用；
+    条目很少，不做淘汰
+    """
+    def __init__(self, path):
+        """
+        :param path: 数据库文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats = {'fresh': 0, 'revalidated': 0, 'unchanged': 0, 'misses': 0, 'saved_bytes': 0}
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+            url TEXT PRIMARY KEY,
+            body TEXT NOT NULL,
+            etag TEXT NOT NULL,
+            last_modified TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            checked REAL NOT NULL)''')
+        self._conn.commit()
+
+    def get(self, url):
+        """
+        :param url: 请求地址
+        :return: dict，body、etag、last_modified、digest、checked(上次向服务器确认的时间)；没有返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, etag, last_modified, digest, checked FROM responses WHERE url=?',
+                (url,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('body', 'etag', 'last_modified', 'digest', 'checked'), row))
+
+    def put(self, url, body, etag='', last_modified='', digest=''):
+        """保存响应，并记为刚刚确认过"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (url, body, etag or '', last_modified or '', digest, time.time()))
+            self._conn.commit()
+
+    def touch(self, url):
+        """服务器确认未变化，重新开始计算有效期"""
+        with self._lock:
+            self._conn.execute('UPDATE responses SET checked=? WHERE url=?', (time.time(), url))
+            self._conn.commit()
+
+    def count(self, key, saved_bytes=0):
+        """
+        记录一次请求的结果
+        :param key: fresh有效期内直接使用、revalidated服务器返回304、unchanged重新下载但内容未变、misses无缓存或已变化
+        :param saved_bytes: 因此少传输的字节数
+        """
+        with self._lock:
+            self._stats[key] += 1
+            self._stats['saved_bytes'] += saved_bytes
+
+    def stats(self):
+        """
+        :return: dict，fresh、revalidated、unchanged、misses各结果的次数，saved_bytes少传输的字节数
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_metadata_cache(path):
+    """
+    获取路径对应的共享接口响应缓存
+    :param path: 数据库文件路径
+    :return: MetadataCache
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _metadata_caches.get(path)
+        if cache is None:
+            cache = MetadataCache(path)
+            _metadata_caches[path] = cache
+        return cache
+
+
+class CoverCache:
+    """
+    封面图片缓存
+    以网址的SHA-1为文件名保存在目录中，读取时更新修改时间；
+    总大小超过max_bytes时按最近使用时间淘汰
+    """
+    def __init__(self, path, max_bytes=64 * 1024 * 1024):
+        """
+        :param path: 缓存目录
+        :param max_bytes: 缓存总大小上限
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, url):
+        return os.path.join(self.path, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.img')
+
+    def get(self, url):
+        """
+        :param url: 封面网址
+        :return: 图片数据，未命中返回None
+        """
+        path = self._file(url)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # 记录最近使用时间
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, url, data):
+        """
+        :param url: 封面网址
+        :param data: 图片数据
+        """
+        path = self._file(url)
+        tmp = f'{path}.{threading.get_ident()}.part'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        """按最近使用时间淘汰到上限的90%"""
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.img'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.path, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                continue
+            total -= size
+
+    def stats(self):
+        """
+        :return: dict，hits命中数、misses未命中数
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+def open_cover_cache(path, max_bytes):
+    """
+    获取目录对应的共享封面缓存
+    :param path: 缓存目录
+    :param max_bytes: 缓存总大小上限
+    :return: CoverCache
+    """
+    path = os.path.abspath(path)
+    with _caches_lock:
+        cache = _cover_caches.get(path)
+        if cache is None:
+            cache = CoverCache(path, max_bytes)
+            _cover_caches[path] = cache
+        cache.max_bytes = max_bytes
+        return cache
@@ -5,9 +5,17 @@
 """
 import re
 import html
+import json
+import hashlib
 
 import utils
-from models import DownloadConfig, ChapterData
+from models import DownloadConfig, ChapterData, ChapterRecord
+
+
+def _chapter_fingerprint(entry):
+    """章节列表条目的指纹，条目任一字段变化则指纹变化"""
+    raw = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
 
 
 def parse_chapters(cdic, novel_id, config):
@@ -19,7 +27,6 @@ def parse_chapters(cdic, novel_id, config):
     :return: (chapter_data, locked_chapters)
     """
     data = ChapterData()
-    loc = []
     vcount = 0
 
     for i in cdic:
@@ -38,22 +45,22 @@ def parse_chapters(cdic, novel_id, config):
         else:
             # 普通章节
             u = f"https://app.jjwxc.net/androidapi/chapterContent?novelId={novel_id}&chapterId={i['chapterid']}"
-            data.href_list.append(u)
             chapter_name = html.escape(i["chaptername"])
             chapter_name = re.sub('&&amp;#', '&#', chapter_name)
             chapter_name = re.sub(r'</?\w+[^>]*>', '', chapter_name)
             chapter_name = re.sub(r'\s+', '', chapter_name)
-            data.titleindex.append(chapter_name.strip())
             chapter_intro = html.escape(i["chapterintro"])
             chapter_intro = re.sub('&&amp;#', '&#', chapter_intro)
             if config.format_type == "txt":
                 chapter_intro = re.sub(r'</?\w+[^>]*>', '', chapter_intro)
-            data.summary_list.append(chapter_intro.strip())
-            if i["islock"] != "0":
-                loc.append(i["chapterid"])
+            locked = i["islock"] != "0"
+            data.add(ChapterRecord(
+                i["chapterid"], u, chapter_name.strip(), chapter_intro.strip(),
+                locked, _chapter_fingerprint(i)
+            ))
 
-    data.fill_num = len(str(len(data.href_list)))
-    return data, loc
+    data.fill_num = len(str(len(data.chapters)))
+    return data, data.locked_ids
 
 
 def build_index(chapter_data, loc, config):
@@ -65,54 +72,90 @@ def build_index(chapter_data, loc, config):
     :return: 目录列表
     """
     index = []
-    for idx, url in enumerate(chapter_data.href_list):
-        titleOrigin = url.split('=')
-        title = ''
-        if titleOrigin[2] in loc:
-            title += "[锁]"
-        title += str(titleOrigin[2]) + " "
-        title += chapter_data.titleindex[idx].strip() + " "
-        title += chapter_data.summary_list[idx].strip()
-        title = utils.convert_text(title, config.state)
-        index.append(title)
+    locked = set(loc)
+    for record in chapter_data.chapters:
+        title = "[锁]" if record.chapter_id in locked else ''
+        title += record.chapter_id + " " + record.title + " " + record.summary
+        index.append(utils.convert_text(title, config.state))
     chapter_data.index = index
     return index
 
 
-def build_title(chapter_url, chapter_data, config):
+def build_title(record, config):
     """
     构建章节标题
-    :param chapter_url: 章节URL
-    :param chapter_data: ChapterData
+    :param record: ChapterRecord
     :param config: DownloadConfig
     :return: 标题字符串
     """
-    titleOrigin = chapter_url.split('=')
-    idx = chapter_data.href_list.index(chapter_url)
     title = ''
 
     if config.custom_title:
-        title = re.sub(r'\$1', str(titleOrigin[2]), config.custom_title)
-        title = re.sub(r'\$2', chapter_data.titleindex[idx].strip(), title)
-        title = re.sub(r'\$3', chapter_data.summary_list[idx].strip(), title)
+        title = re.sub(r'\$1', record.chapter_id, config.custom_title)
+        title = re.sub(r'\$2', record.title, title)
+        title = re.sub(r'\$3', record.summary, title)
     else:
         if config.show_number:
-            title = str(titleOrigin[2])
+            title = record.chapter_id
             if config.format_type == 'txt':
                 title += " #"
         if config.show_title:
-            title = title + " " + chapter_data.titleindex[idx].strip()
+            title = title + " " + record.title
         if config.show_summary:
-            title = title + " " + chapter_data.summary_list[idx].strip()
+            title = title + " " + record.summary
 
     title = title.strip()
     title = utils.convert_text(title, config.state)
     return title
 
 
+# 正文处理用到的正则，模块加载时编译一次
+_P_TAG = re.compile(r'</?p>')
+_BR_PAIR = re.compile(r' ?<br/> ?<br/> ?')
+_EMPTY_P = re.compile('<p> *</p>')
+_BLANK_P_RUN = re.compile('(<p><br/></p>)+')
+
+
+def _format_title(title, is_txt):
+    """章节标题行"""
+    if is_txt:
+        return "\n\n" + utils.unescape_html(title) + "\n"
+    return '<h2>' + utils.escape_html(title).replace('&amp;amp;', '&amp;') + "</h2>"
+
+
+def _format_say(text, is_txt):
+    """作者有话说部分，text已清理并转义"""
+    if not len(text.strip()):
+        return ''
+    lines = text.splitlines()
+    if is_txt:
+        unescape = html.unescape
+        return "作者有话要说：\n" + ''.join([unescape(v).strip() + "\n" for v in lines])
+    return ("<p><b>作者有话要说</b>：</p><blockquote>"
+            + ''.join(["<p>" + v + "</p>" for v in lines]) + "</blockquote>")
+
+
+def _format_body(text, is_txt, remove_blank_lines):
+    """正文部分，text已清理并转义"""
+    lines = text.splitlines()
+    if not is_txt:
+        body = '<p>' + ''.join([v + "<br/>" for v in lines]) + "</p>"
+        return _BR_PAIR.sub('</p><p>', body)
+
+    unescape = html.unescape
+    p_tag = _P_TAG
+    # 去掉独立及行内的<p>标签
+    body = ''.join([p_tag.sub('', unescape(v).strip()) + "\n" for v in lines])
+    if remove_blank_lines:
+        # txt模式：去除段间空行
+        body = '\n'.join(line for line in body.split('\n') if line.strip()) + '\n'
+    return body
+
+
 def format_content(title, raw_data, config, fill_num):
     """
     格式化章节内容
+    TXT与XHTML共用同一流程：正文与作话各自按行处理后一次拼接，正则均为预编译
     :param title: 章节标题
     :param raw_data: api.fetch_chapter_content返回的dict
     :param config: DownloadConfig
@@ -122,93 +165,62 @@ def format_content(title, raw_data, config, fill_num):
     tex = raw_data['content']
     tex1 = raw_data['sayBody']
     sign = raw_data['upDown']
-    texm = raw_data['message']
     is_txt = config.format_type == 'txt'
-    failed_id = None
 
-    content = ''
-
-    # 写入标题
-    if is_txt:
-        title_display = utils.unescape_html(title)
-        content += "\n\n" + title_display + "\n"
-    else:
-        title_display = utils.escape_html(title)
-        title_display = re.sub('&amp;amp;', '&amp;', title_display)
-        content += '<h2>' + title_display + "</h2>"
+    parts = [_format_title(title, is_txt)]
 
     if len(tex) == 0:
         # 下载失败
+        texm = raw_data['message']
+        parts.append(texm + "\n" if is_txt else '<p>' + texm + '</p>')
+        return ''.join(parts), True
+
+    # 添加章节信息
+    if config.show_chinfo:
         if is_txt:
-            content += texm + "\n"
+            parts.append("字数：" + raw_data['chapterSize'] + '\n日期：' + raw_data['chapterDate'] + '\r\n')
         else:
-            content += '<p>' + texm + '</p>'
-        return content, True
-    else:
-        # 添加章节信息
-        if config.show_chinfo:
-            if is_txt:
-                content += "字数：" + raw_data['chapterSize'] + '\n日期：' + raw_data['chapterDate'] + '\r\n'
-            else:
-                content += "<p class='note'>字数：" + raw_data['chapterSize'] + '<br/>日期：' + raw_data['chapterDate'] + '</p>'
-
-        # 处理作话
-        if config.del_thanks:
-            tex1 = utils.remove_thanks_content(tex1)
-
-        tex1 = utils.clean_text(tex1)
-        tex1 = utils.escape_html(tex1)
-        tex = utils.clean_text(tex)
-        tex = utils.escape_html(tex)
-
-        contenta = ''
-        contentb = '' if is_txt else '<p>'
-
-        # 作话内容
-        if len(tex1.strip()):
-            if not is_txt:
-                contenta += "<p><b>作者有话要说</b>：</p><blockquote>"
-            else:
-                contenta += "作者有话要说：\n"
-            for v in tex1.splitlines():
-                if is_txt:
-                    v = utils.unescape_html(v).strip()
-                    contenta += v + "\n"
-                else:
-                    contenta += "<p>" + v + "</p>"
-            if not is_txt:
-                contenta += "</blockquote>"
-
-        # 正文内容
-        for v in tex.splitlines():
-            if is_txt:
-                v = utils.unescape_html(v).strip()
-                v = re.sub(r'^</?p>$', '', v)  # 去掉独立的<p>标签行
-                v = re.sub(r'</?p>', '', v)  # 去掉行内的<p>标签
-                contentb += v + "\n"
-            else:
-                contentb += v + "<br/>"
-        if not is_txt:
-            contentb += "</p>"
-            contentb = re.sub(r' ?<br/> ?<br/> ?', '</p><p>', contentb)
-
-        # txt模式：去除段间空行
-        if is_txt and config.remove_blank_lines:
-            lines = contentb.split('\n')
-            contentb = '\n'.join(line for line in lines if line.strip()) + '\n'
-
-        # 根据作话位置组合内容
-        separator = "\n*\n" if is_txt else "<hr/>"
-        if sign:  # 作话在文后
-            content += contentb + separator + contenta
-        else:  # 作话在文前
-            content += contenta + separator + contentb
-
+            parts.append("<p class='note'>字数：" + raw_data['chapterSize'] + '<br/>日期：'
+                         + raw_data['chapterDate'] + '</p>')
+
+    # 处理作话
+    if config.del_thanks:
+        tex1 = utils.remove_thanks_content(tex1)
+
+    contenta = _format_say(utils.escape_html(utils.clean_text(tex1)), is_txt)
+    contentb = _format_body(utils.escape_html(utils.clean_text(tex)), is_txt,
+                            is_txt and config.remove_blank_lines)
+
+    # 根据作话位置组合内容
+    separator = "\n*\n" if is_txt else "<hr/>"
+    if sign:  # 作话在文后
+        parts += [contentb, separator, contenta]
+    else:  # 作话在文前
+        parts += [contenta, separator, contentb]
     if not is_txt:
-        content += "</body></html>"
+        parts.append("</body></html>")
 
-    content = re.sub("<p> *</p>", "<p><br/></p>", content)
-    content = re.sub("(<p><br/></p>)+", "<p><br/></p>", content)
+    content = ''.join(parts)
+    content = _EMPTY_P.sub("<p><br/></p>", content)
+    content = _BLANK_P_RUN.sub("<p><br/></p>", content)
     content = utils.convert_text(content, config.state)
 
     return content, False
+
+
+def render_batch(items, config, fill_num):
+    """
+    批量解密并格式化章节，供进程池调用
+    :param items: [(title, raw_data), ...]，raw_data正文可为密文
+    :param config: DownloadConfig
+    :param fill_num: 章节填充位数
+    :return: [(raw_data, formatted_content, is_failed), ...]，与items顺序一致，raw_data已解密
+    """
+    import api
+
+    results = []
+    for title, raw in items:
+        api.decrypt_chapter(raw)
+        content, failed = format_content(title, raw, config, fill_num)
+        results.append((raw, content, failed))
+    return results
@@ -0,0 +1,388 @@
+# -*- coding: UTF-8 -*-
+"""
+晋江小说下载器 - 命令行版
+不加载任何界面库，适合定时任务与容器中运行
+配置依次来自DownloadConfig默认值、config.yml、命令行参数；进度与日志以JSON行输出到标准输出
+
+用法：
+    python cli.py https://www.jjwxc.net/onebook.php?novelid=xxx --format epub3
+    python cli.py --batch novels.txt --jobs 4
+退出码见EXIT_*
+"""
+import os
+import re
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+from models import DownloadConfig
+
+
+_BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_FILE = os.path.join(_BASE_DIR, 'config.yml')
+DEFAULT_CSS = '''nav#landmarks {display:none;}
+nav#page-list {display:none;}
+ol {list-style-type: none;}/*epub3目录格式*/
+h1{font-size:1.4em;text-align:center;}/*一级标题*/
+h2{font-size:1.24em;text-align:center;}/*二级标题*/
+.title{text-align:center;}/*文章名*/
+.note{font-size:0.8em;text-align:right;}/*章节信息*/
+body{text-indent:2em;}/*全局格式*/'''
+
+URL_PATTERN = re.compile(r'(http|https)://www.jjwxc.net/onebook.php\?novelid=[0-9]+')
+
+EXIT_OK = 0  # 全部完成
+EXIT_FAILED = 1  # 下载失败（获取信息失败、出错等）
+EXIT_USAGE = 2  # 参数或配置错误
+EXIT_PARTIAL = 3  # 已生成文件，但有章节未购买、加载失败或未完成
+EXIT_INTERRUPTED = 130  # 被Ctrl+C或SIGTERM中断
+
+
+# ============================================================
+# 配置
+# ============================================================
+
+def load_config(path):
+    """
+    读取config.yml
+    :param path: 文件路径
+    :return: dict，文件不存在返回空dict
+    """
+    if not os.path.exists(path):
+        return {}
+    import yaml
+    with open(path, encoding='utf-8') as f:
+        return yaml.load(f.read(), Loader=yaml.FullLoader) or {}
+
+
+def apply_config_file(config, conf):
+    """
+    把config.yml的内容写入DownloadConfig
+    图形界面保存的键（token、format、titleInfo等）按界面的含义转换；
+    与DownloadConfig字段同名的键直接覆盖，可用来设置界面上没有的选项
+    :param config: DownloadConfig
+    :param conf: load_config的返回值
+    """
+    if 'token' in conf:
+        config.token = conf['token'] or ''
+    if 'ThreadPoolMaxNum' in conf:
+        config.thread_num = int(conf['ThreadPoolMaxNum'])
+    if 'format' in conf:
+        config.format_type = conf['format'] or 'txt'
+    if 'state' in conf:
+        config.state = conf['state'] or ''
+    if 'titleInfo' in conf:
+        ti = str(conf['titleInfo']).split(' ')
+        while len(ti) < 3:
+            ti.append('1')
+        config.show_number = ti[0] != '0'
+        config.show_title = ti[1] != '0'
+        config.show_summary = ti[2] != '0'
+    if 'chinfo' in conf:
+        config.show_chinfo = bool(conf['chinfo'])
+    if 'cover' in conf:
+        config.add_cover = bool(conf['cover'])
+    if 'delthk' in conf:
+        config.del_thanks = bool(conf['delthk'])
+    if 'special' in conf:
+        config.special_intro = bool(conf['special'])
+    if 'htmlvol' in conf:
+        config.html_vol = bool(conf['htmlvol'])
+    if isinstance(conf.get('selftitle'), str):
+        config.custom_title = conf['selftitle']
+    if isinstance(conf.get('volumn'), str):
+        config.custom_vol = conf['volumn']
+    config.css_text = conf.get('css') or DEFAULT_CSS
+
+    for key, value in conf.items():
+        if hasattr(config, key) and value is not None:
+            setattr(config, key, value)
+
+
+def parse_value(config, key, text):
+    """
+    按DownloadConfig字段的默认值类型转换--set的值
+    :return: 转换后的值
+    """
+    if not hasattr(config, key):
+        raise ValueError(f'未知的配置项：{key}')
+    default = getattr(config, key)
+    if isinstance(default, bool):
+        if text.lower() in ('1', 'true', 'yes', 'on'):
+            return True
+        if text.lower() in ('0', 'false', 'no', 'off', ''):
+            return False
+        raise ValueError(f'{key}应为true或false：{text}')
+    if isinstance(default, int):
+        return int(text)
+    if isinstance(default, float):
+        return float(text)
+    return text
+
+
+def build_config(args):
+    """
+    :param args: parse_args的结果
+    :return: DownloadConfig
+    """
+    config = DownloadConfig()
+    # 命令行版用于重复导出与定时更新，默认开启各项缓存（可在config.yml中关闭）
+    config.use_cache = config.metadata_cache = config.cover_cache = True
+    if not args.no_config:
+        apply_config_file(config, load_config(args.config))
+    else:
+        config.css_text = DEFAULT_CSS
+
+    options = {
+        'token': args.token,
+        'format_type': args.format,
+        'state': args.state,
+        'thread_num': args.threads,
+        'engine': args.engine,
+        'output_dir': args.output_dir,
+        'chapter_start': args.start,
+        'chapter_end': args.end,
+    }
+    for key, value in options.items():
+        if value is not None:
+            setattr(config, key, value)
+    if args.per_chapter:
+        config.save_per_chapter = True
+    if args.no_cover:
+        config.add_cover = False
+    if args.update:
+        config.update_mode = True
+    if args.no_cache:
+        config.use_cache = config.metadata_cache = config.cover_cache = False
+
+    for item in args.set:
+        key, sep, text = item.partition('=')
+        if not sep:
+            raise ValueError(f'--set的格式应为 键=值：{item}')
+        key = key.strip()
+        setattr(config, key, parse_value(config, key, text.strip()))
+
+    if config.format_type not in ('txt', 'epub2', 'epub3'):
+        raise ValueError(f'不支持的格式：{config.format_type}')
+    if config.format_type != 'txt':
+        config.save_per_chapter = False
+        config.remove_blank_lines = False
+    return config
+
+
+def normalize_url(text):
+    """
+    :param text: 小说网址或小说ID
+    :return: 网页版网址
+    """
+    text = text.strip()
+    if text.isdigit():
+        return 'https://www.jjwxc.net/onebook.php?novelid=' + text
+    if not URL_PATTERN.match(text):
+        raise ValueError(f'网址格式错误，请使用网页版网址：{text}')
+    return text
+
+
+# ============================================================
+# 输出
+# ============================================================
+
+class EventWriter:
+    """
+    把事件逐行写为JSON，每行一个对象，event字段为事件类型：
+    start、log、progress、result、stats(批量下载)、end
+    下载线程会同时调用，写入时加锁
+    """
+    def __init__(self, stream=None, progress_interval=1.0):
+        """
+        :param stream: 输出流，默认为标准输出
+        :param progress_interval: 同一部小说两次progress事件的最小间隔(秒)，完成时总会输出
+        """
+        self.stream = stream or sys.stdout
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._last_progress = {}
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+    def log(self, message, url=None):
+        message = message.strip()
+        if message:
+            self.emit('log', url=url, message=message)
+
+    def progress(self, url, percent, current, total, concurrency=None):
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_progress.get(url)
+            if current < total and last is not None and now - last < self.progress_interval:
+                return
+            self._last_progress[url] = now
+        self.emit('progress', url=url, percent=percent, current=current, total=total,
+                  concurrency=concurrency)
+
+
+# ============================================================
+# 下载
+# ============================================================
+
+def _terminate(signum, frame):
+    # 与Ctrl+C相同处理，下载器会中止正在写入的输出
+    raise KeyboardInterrupt
+
+
+def _output_path(config, output_file):
+    """下载器返回的文件名相对于输出目录，事件中给出绝对路径"""
+    if not output_file:
+        return output_file
+    return os.path.abspath(os.path.join(config.output_dir or os.getcwd(), output_file))
+
+
+def run_single(url, config, events):
+    """
+    下载一部小说
+    :return: 退出码
+    """
+    from downloader import NovelDownloader, configure_network
+
+    configure_network(config)
+    downloader = NovelDownloader(
+        config,
+        lambda pct, current, total, concurrency=None: events.progress(url, pct, current, total, concurrency),
+        lambda message: events.log(message, url),
+    )
+    events.emit('start', url=url, format=config.format_type)
+    try:
+        success, output_file, error = downloader.download_novel(url)
+    except Exception as e:
+        success, output_file, error = False, None, str(e)
+
+    failed = sorted(downloader.fail_info)
+    total = len(downloader.chapter_data or [])
+    events.emit('result', url=url, success=success, output_file=_output_path(config, output_file), error=error,
+                chapters=downloader.percent, total=total, failed_chapters=failed)
+    if not success:
+        return EXIT_FAILED
+    return EXIT_PARTIAL if failed or downloader.percent < total else EXIT_OK
+
+
+def run_batch(jobs, config, args, events):
+    """
+    批量下载，多部小说共用章节线程池
+    :param jobs: [BatchJob]
+    :return: 退出码，任一部失败为EXIT_FAILED，否则有章节缺失为EXIT_PARTIAL
+    """
+    from batch import BatchDownloader
+
+    batch = BatchDownloader(
+        config,
+        max_workers=config.thread_num,
+        max_jobs=args.jobs,
+        adaptive=config.adaptive_concurrency,
+        progress_callback=lambda job, pct, current, total: events.progress(job.url, pct, current, total),
+        log_callback=events.log,
+    )
+    batch.jobs.extend(jobs)
+    events.emit('start', urls=[job.url for job in jobs], format=config.format_type)
+    batch.run()
+
+    code = EXIT_OK
+    for job in batch.jobs:
+        events.emit('result', url=job.url, success=job.status == 'done',
+                    output_file=_output_path(job.config or config, job.output_file), error=job.error,
+                    chapters=job.chapters, total=job.total, failed_chapters=job.failed)
+        if job.status != 'done':
+            code = EXIT_FAILED
+        elif (job.failed or job.chapters < job.total) and code == EXIT_OK:
+            code = EXIT_PARTIAL
+    stats = batch.stats()
+    stats['elapsed'] = round(stats['elapsed'], 3)
+    stats['rate'] = round(stats['rate'], 2)
+    events.emit('stats', **stats)
+    return code
+
+
+def build_jobs(urls, batch_file, config):
+    """
+    :return: [BatchJob]，网址已规范化
+    """
+    from batch import BatchJob, load_jobs
+
+    jobs = load_jobs(batch_file, config) if batch_file else []
+    jobs.extend(BatchJob(url) for url in urls)
+    for job in jobs:
+        job.url = normalize_url(job.url)
+    return jobs
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='晋江小说下载器（命令行版），进度与日志以JSON行输出到标准输出',
+        epilog='退出码：0完成，1失败，2参数错误，3部分章节失败，130中断',
+    )
+    parser.add_argument('urls', nargs='*', metavar='URL', help='小说网址或小说ID')
+    parser.add_argument('-b', '--batch', metavar='FILE', help='任务列表文件，每行一个网址或JSON（见batch.parse_job）')
+    parser.add_argument('-j', '--jobs', type=int, default=4, help='批量下载时同时进行的小说数（默认4）')
+    parser.add_argument('-c', '--config', default=CONFIG_FILE, help='配置文件（默认程序目录下的config.yml）')
+    parser.add_argument('--no-config', action='store_true', help='不读取配置文件')
+    parser.add_argument('-t', '--token', help='Token')
+    parser.add_argument('-f', '--format', choices=['txt', 'epub2', 'epub3'], help='输出格式')
+    parser.add_argument('--state', choices=['', 's', 't'], help='繁简转换：s繁转简，t简转繁')
+    parser.add_argument('-n', '--threads', type=int, help='线程数')
+    parser.add_argument('--engine', choices=['thread', 'async'], help='章节下载引擎')
+    parser.add_argument('-o', '--output-dir', help='输出目录（默认当前目录）')
+    parser.add_argument('--start', type=int, help='起始章节号')
+    parser.add_argument('--end', type=int, help='结束章节号')
+    parser.add_argument('--per-chapter', action='store_true', help='按章保存（仅txt）')
+    parser.add_argument('--no-cover', action='store_true', help='不下载封面')
+    parser.add_argument('--update', action='store_true', help='增量更新，没有变化时沿用上次的文件')
+    parser.add_argument('--no-cache', action='store_true', help='不使用章节、小说信息与封面缓存')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='设置DownloadConfig的任意字段，可重复，如 --set compress_level=9')
+    parser.add_argument('--progress-interval', type=float, default=1.0,
+                        help='progress事件的最小间隔秒数（默认1，0为每章输出）')
+    args = parser.parse_args(argv)
+    if not args.urls and not args.batch:
+        parser.error('需要小说网址或--batch任务列表')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    events = EventWriter(progress_interval=args.progress_interval)
+    try:
+        config = build_config(args)
+        urls = [normalize_url(url) for url in args.urls]
+        jobs = build_jobs(urls, args.batch, config) if args.batch or len(urls) > 1 else None
+    except Exception as e:
+        events.emit('end', exit_code=EXIT_USAGE, error=str(e))
+        return EXIT_USAGE
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        if jobs is not None:
+            code = run_batch(jobs, config, args, events)
+        else:
+            code = run_single(urls[0], config, events)
+    except KeyboardInterrupt:
+        events.emit('end', exit_code=EXIT_INTERRUPTED, error='已中断')
+        if jobs is not None:
+            # 批量下载的小说在其它线程中进行，无法打断；未完成的txt、epub只留下.part文件，
+            # 分章节保存的目录中只有已写完的章节，直接退出
+            os._exit(EXIT_INTERRUPTED)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        events.emit('end', exit_code=EXIT_FAILED, error=str(e))
+        return EXIT_FAILED
+    events.emit('end', exit_code=code)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
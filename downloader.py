@@ -4,36 +4,100 @@
 组合api、chapter、output模块，编排完整的下载流程
 """
 import os
+import time
+import threading
 import concurrent.futures
+from collections import deque
 
 import api
 import chapter
 import output
 import utils
+from cache import open_chapter_cache, open_metadata_cache, open_cover_cache
+from limiter import AdaptiveLimiter
 from models import DownloadConfig, NovelInfo
 
 
+def _stats_delta(current, base):
+    """两次统计快照之差（统计值为进程级累计）"""
+    return {k: v - base.get(k, 0) for k, v in current.items()}
+
+
+# 对进程内所有下载生效的网络设置；图形界面没有对应选项，从config.yml读取
+NETWORK_OPTIONS = ('breaker_threshold', 'breaker_cooldown', 'rate_limit', 'rate_burst')
+
+
+def network_config(conf):
+    """
+    取出config.yml中的网络设置
+    :param conf: config.yml的内容
+    :return: DownloadConfig，其余设置为默认值
+    """
+    config = DownloadConfig()
+    for key in NETWORK_OPTIONS:
+        if conf.get(key) is not None:
+            setattr(config, key, conf[key])
+    return config
+
+
+def configure_network(config, changed_only=False):
+    """
+    按config设置进程内所有下载共享的熔断与API限速
+    命令行和批量下载在开始前按完整设置调用一次；单部小说下载时只应用与默认值不同的设置，
+    且限速只会收紧，以免一部小说的默认值放宽正在进行的其它下载的限速
+    :param config: DownloadConfig
+    :param changed_only: 只应用与DownloadConfig默认值不同的设置
+    """
+    default = DownloadConfig()
+    breaker = (config.breaker_threshold, config.breaker_cooldown)
+    if not changed_only or breaker != (default.breaker_threshold, default.breaker_cooldown):
+        api.configure_breaker(*breaker)
+    if not changed_only:
+        api.configure_rate_limit(api.API_BASE, config.rate_limit, config.rate_burst)
+    elif config.rate_limit > 0:
+        bucket = api.get_bucket(api.API_BASE)
+        if not bucket.rate or config.rate_limit < bucket.rate:
+            api.configure_rate_limit(api.API_BASE, config.rate_limit, config.rate_burst)
+
+
 class NovelDownloader:
     """小说下载编排器"""
 
-    def __init__(self, config=None, progress_callback=None, log_callback=None):
+    def __init__(self, config=None, progress_callback=None, log_callback=None, scheduler=None):
         """
         :param config: DownloadConfig 配置对象
-        :param progress_callback: 进度回调 (percent, current, total)
+        :param progress_callback: 进度回调 (percent, current, total, concurrency)，concurrency为当前并发数
         :param log_callback: 日志回调 (message)
+        :param scheduler: batch.FairScheduler，批量下载时章节交给共享线程池，None则使用自己的线程池
         """
         self.config = config or DownloadConfig()
         self.progress_callback = progress_callback
         self.log_callback = log_callback
+        self.scheduler = scheduler
+        self._lock = threading.Lock()  # 保护percent与fail_info，章节由多个线程同时写入
         self.reset()
 
     def reset(self):
         """重置状态"""
         self.percent = 0
         self.fail_info = []
+        self.unavailable = set()  # 未购买或被锁的章节ID
         self.current_title = ''
         self.novel_info = None
         self.chapter_data = None
+        self.retry_policy = api.RetryPolicy.from_config(self.config)
+        self.limiter = None
+        self.cache = None
+        self.journal = None
+        self.writer = None
+        self.filenames = {}
+        self.max_workers = self.config.thread_num
+        self._stop = threading.Event()  # 出错或中断后不再开始新的章节
+
+    @property
+    def concurrency(self):
+        """当前允许同时进行的章节请求数"""
+        return self.limiter.limit if self.limiter else self.max_workers
 
     def _log(self, message):
         if self.log_callback:
@@ -42,23 +106,421 @@ class NovelDownloader:
     def _update_progress(self, current, total):
         if self.progress_callback:
             pct = int(100 * current / total) if total > 0 else 0
-            self.progress_callback(pct, current, total)
+            self.progress_callback(pct, current, total, self.concurrency)
 
-    def _download_and_save_chapter(self, chapter_url):
+    def _load_cached(self, record):
+        """从章节缓存读取，未命中返回None"""
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self.novel_info.novel_id, record.chapter_id, record.fingerprint)
+        if cached is None:
+            return None
+        raw = api.new_chapter_result()
+        raw.update(cached)
+        raw['cached'] = True
+        return raw
+
+    def _store_cached(self, record, raw):
+        """写入章节缓存"""
+        if self.cache is None or raw.get('cached'):
+            return
+        self.cache.put(self.novel_info.novel_id, record.chapter_id, record.fingerprint, raw)
+
+    def _download_and_save_chapter(self, record):
         """下载并保存单个章节"""
-        title = chapter.build_title(chapter_url, self.chapter_data, self.config)
-        raw = api.fetch_chapter_content(chapter_url, self.config.token)
+        # 按顺序写入时等前面的章节写出，避免缓冲过多
+        self.writer.wait_ready(self.filenames[record.chapter_id])
+        if self._stop.is_set():
+            return
+        try:
+            raw = self._load_cached(record)
+            if raw is None:
+                raw = self._fetch_chapter(record.url)
+                self._store_cached(record, raw)
+            self._save_chapter(record, raw)
+        except Exception as e:
+            self._fail_chapter(record, e)
+
+    def _fail_chapter(self, record, error):
+        """
+        章节处理出错时写入失败说明并记为失败章节，
+        占住它在输出中的位置，按顺序写入时后面的章节不会一直等待
+        """
+        self._log(f"第{record.chapter_id}章处理出错：{error!r}")
+        raw = api.new_chapter_result()
+        raw['message'] = f'处理出错：{error!r}'
+        self._save_chapter(record, raw)
+
+    def _stop_chapters(self, executor=None):
+        """出错或中断时停止下载：不再开始新章节，放弃输出以唤醒等待写入的线程，取消排队的任务"""
+        self._stop.set()
+        self.writer.abort()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_chapter(self, chapter_url, decrypt=True):
+        """请求单个章节，开启自适应并发时受限制器控制"""
+        if self.limiter is None:
+            raw = api.fetch_chapter_content(
+                chapter_url, self.config.token, self.retry_policy, id(self), decrypt
+            )
+        else:
+            self.limiter.acquire()
+            start = time.monotonic()
+            ok = False
+            try:
+                raw = api.fetch_chapter_content(
+                    chapter_url, self.config.token, self.retry_policy, id(self), decrypt
+                )
+                ok = raw['retries'] == 0
+            finally:
+                self.limiter.release(ok, time.monotonic() - start)
+        return raw
+
+    def _save_chapter(self, record, raw):
+        """格式化并保存已获取的章节"""
+        title = chapter.build_title(record, self.config)
         content, failed = chapter.format_content(
             title, raw, self.config, self.chapter_data.fill_num
         )
+        self._write_chapter(record, title, content, failed, raw)
+
+    def _write_chapter(self, record, title, content, failed, raw):
+        """写入已格式化的章节并记录进度；未购买或被锁的章节另行记录，增量更新时不必重新获取"""
         self.current_title = title
+        filename = self.filenames[record.chapter_id]
+        written = self.writer.write(filename, output.chapter_document(title, content, self.config))
+        if self.journal is not None and not failed:
+            size, digest = written
+            self.journal.record(record.chapter_id, filename, size, digest)
+        with self._lock:
+            if failed:
+                self.fail_info.append(record.chapter_id.zfill(self.chapter_data.fill_num))
+                if record.locked or api.needs_purchase(raw['message']):
+                    self.unavailable.add(record.chapter_id)
+            self.percent += 1
+
+    def _fetch_raw(self, record):
+        """进程池模式：只获取章节，正文保持密文（缓存命中时为明文）；出错时记为失败章节并返回None"""
+        try:
+            raw = self._load_cached(record)
+            if raw is None:
+                raw = self._fetch_chapter(record.url, decrypt=False)
+            return raw
+        except Exception as e:
+            self._fail_chapter(record, e)
+            return None
+
+    def _finish_batch(self, batch, results):
+        """
+        写入进程池返回的一批章节，并缓存解密后的内容
+        :param batch: [(record, title, raw), ...]
+        :param results: render_batch的结果；为None表示进程池处理出错，逐章在本线程处理
+        """
+        if results is None:
+            for record, title, raw in batch:
+                try:
+                    api.decrypt_chapter(raw)
+                    self._store_cached(record, raw)
+                    self._save_chapter(record, raw)
+                except Exception as e:
+                    self._fail_chapter(record, e)
+            return
+        for (record, title, _), (raw, content, failed) in zip(batch, results):
+            self._store_cached(record, raw)
+            self._write_chapter(record, title, content, failed, raw)
+
+    def _render_items(self, batch):
+        """render_batch的参数"""
+        return [(title, raw) for _, title, raw in batch]
+
+    def _download_chapters_offload(self, records, threadnum, section_ct, procs):
+        """
+        线程只负责网络请求，按章节顺序每cpu_batch_size章一批交给进程池解密、格式化、繁简转换，
+        结果按提交顺序写出；已提交未写出的章节有上限，不会把整本书的响应堆在内存中
+        """
+        batch_size = max(1, self.config.cpu_batch_size)
+        fill_num = self.chapter_data.fill_num
+        window = threadnum + 2 * batch_size  # 同时获取中的章节数上限
+        max_pending = max(2, 2 * self.config.cpu_workers)  # 进程池中排队的批次上限
+        records = iter(records)
+        fetching = deque()
+        pending = deque()
+
+        def fill(executor):
+            while len(fetching) < window and not self._stop.is_set():
+                record = next(records, None)
+                if record is None:
+                    return
+                fetching.append((record, executor.submit(self._fetch_raw, record)))
 
-        if failed:
-            chap_id = chapter_url.split('=')[2]
-            self.fail_info.append(chap_id.zfill(self.chapter_data.fill_num))
+        def drain(limit):
+            while pending and (len(pending) > limit or pending[0][1].done()):
+                batch, future = pending.popleft()
+                try:
+                    results = future.result()
+                except Exception as e:
+                    self._log(f"进程池处理出错，改在下载线程中处理：{e!r}")
+                    results = None
+                self._finish_batch(batch, results)
+                self._update_progress(self.percent, section_ct)
+
+        def submit(batch):
+            pending.append((batch, procs.submit(
+                chapter.render_batch, self._render_items(batch), self.config, fill_num)))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threadnum) as executor:
+            try:
+                batch = []
+                fill(executor)
+                # 按提交顺序取结果，网络请求仍并发进行
+                while fetching:
+                    record, future = fetching.popleft()
+                    raw = future.result()
+                    fill(executor)
+                    if raw is None:
+                        self._update_progress(self.percent, section_ct)
+                    else:
+                        batch.append((record, chapter.build_title(record, self.config), raw))
+                    if len(batch) >= batch_size:
+                        submit(batch)
+                        batch = []
+                    drain(max_pending)
+                if batch:
+                    submit(batch)
+                drain(0)
+            except BaseException:
+                self._stop_chapters(executor)
+                raise
 
-        output.save_chapter_file(chapter_url, title, content, self.config)
-        self.percent += 1
+    def _download_chapters(self, records, threadnum, section_ct):
+        """
+        按配置的引擎下载章节
+        :param records: 待下载的ChapterRecord
+        :param threadnum: 线程数（并发上限）
+        :param section_ct: 本次章节总数（含续传跳过的章节），用于进度
+        """
+        if self.scheduler is not None:
+            # 批量下载：并发由共享线程池及其限制器统一控制，不使用引擎与进程池设置
+            self.max_workers = self.scheduler.max_workers
+            self.limiter = self.scheduler.limiter
+            self._download_chapters_shared(records, section_ct)
+            return
+
+        self.max_workers = threadnum
+        if self.config.adaptive_concurrency:
+            # thread_num作为上限，实际并发由AIMD控制
+            self.limiter = AdaptiveLimiter(threadnum)
+
+        if self.config.cpu_workers > 0:
+            self._log(f"解密与格式化使用{self.config.cpu_workers}个进程")
+            with concurrent.futures.ProcessPoolExecutor(self.config.cpu_workers) as procs:
+                self._download_chapters_with(records, threadnum, section_ct, procs)
+        else:
+            self._download_chapters_with(records, threadnum, section_ct, None)
+
+    def _download_chapters_with(self, records, threadnum, section_ct, procs):
+        """按引擎分派，procs为进程池（None表示在下载线程内处理）"""
+        if self.config.engine == 'async':
+            if api.aiohttp_available():
+                import asyncio  # 只有异步引擎需要
+
+                asyncio.run(self._download_chapters_async(records, threadnum, section_ct, procs))
+                return
+            self._log("未安装aiohttp，改用线程池下载")
+
+        if procs is not None:
+            self._download_chapters_offload(records, threadnum, section_ct, procs)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threadnum) as executor:
+            futures = {
+                executor.submit(self._download_and_save_chapter, c): c
+                for c in records
+            }
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    future.result()
+                    self._update_progress(self.percent, section_ct)
+            except BaseException:
+                self._stop_chapters(executor)
+                raise
+
+    def _download_chapters_shared(self, records, section_ct):
+        """把章节提交到批量下载的共享线程池，与其他小说的章节轮流执行"""
+        futures = [
+            self.scheduler.submit(self, self._download_and_save_chapter, c)
+            for c in records
+        ]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                self._update_progress(self.percent, section_ct)
+        except BaseException:
+            self._stop_chapters()
+            for future in futures:
+                future.cancel()
+            raise
+
+    async def _download_chapters_async(self, records, concurrency, section_ct, procs=None):
+        """
+        asyncio引擎：单事件循环内并发获取，信号量或自适应限制器控制同时进行的请求数
+        procs不为None时每cpu_batch_size个连续章节一批，获取后一起交给进程池解密和格式化
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(concurrency)
+        cond = asyncio.Condition()
+        loop = asyncio.get_running_loop()
+        fill_num = self.chapter_data.fill_num
+
+        async with api.create_async_session(concurrency) as session:
+            async def fetch(chapter_url):
+                return await api.fetch_chapter_content_async(
+                    session, chapter_url, self.config.token, self.retry_policy, id(self),
+                    decrypt=procs is None
+                )
+
+            async def fetch_limited(chapter_url):
+                if self.limiter is None:
+                    async with semaphore:
+                        raw = await fetch(chapter_url)
+                else:
+                    await self.limiter.acquire_async(cond)
+                    start = time.monotonic()
+                    ok = False
+                    try:
+                        raw = await fetch(chapter_url)
+                        ok = raw['retries'] == 0
+                    finally:
+                        await self.limiter.release_async(cond, ok, time.monotonic() - start)
+                return raw
+
+            async def wait_ready(record):
+                filename = self.filenames[record.chapter_id]
+                if not self.writer.ready(filename):
+                    async with cond:
+                        await cond.wait_for(lambda: self.writer.ready(filename))
+                return not self._stop.is_set()
+
+            async def finished():
+                async with cond:
+                    cond.notify_all()
+                self._update_progress(self.percent, section_ct)
+
+            async def worker(record):
+                if not await wait_ready(record):
+                    return
+                try:
+                    raw = self._load_cached(record)
+                    if raw is None:
+                        raw = await fetch_limited(record.url)
+                    self._store_cached(record, raw)
+                    self._save_chapter(record, raw)
+                except Exception as e:
+                    self._fail_chapter(record, e)
+                await finished()
+
+            async def fetch_raw(record):
+                try:
+                    raw = self._load_cached(record)
+                    if raw is None:
+                        raw = await fetch_limited(record.url)
+                    return raw
+                except Exception as e:
+                    self._fail_chapter(record, e)
+                    return None
+
+            async def batch_worker(records):
+                # 连续的一批章节：并发获取后一起交给进程池；第一章可写入时整批才开始，不会卡住重排缓冲区
+                if not await wait_ready(records[0]):
+                    return
+                raws = await asyncio.gather(*(fetch_raw(c) for c in records))
+                batch = [(c, chapter.build_title(c, self.config), raw)
+                         for c, raw in zip(records, raws) if raw is not None]
+                if batch:
+                    try:
+                        results = await loop.run_in_executor(
+                            procs, chapter.render_batch, self._render_items(batch), self.config, fill_num
+                        )
+                    except Exception as e:
+                        self._log(f"进程池处理出错，改在下载线程中处理：{e!r}")
+                        results = None
+                    self._finish_batch(batch, results)
+                await finished()
+
+            if procs is None:
+                tasks = [worker(c) for c in records]
+            else:
+                batch_size = max(1, self.config.cpu_batch_size)
+                tasks = [batch_worker(records[i:i + batch_size]) for i in range(0, len(records), batch_size)]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                self._stop_chapters()
+                raise
+
+    def _prepare_cover(self, cover_url, cover_cache):
+        """下载封面并转为要写入的JPEG，在后台线程中执行"""
+        cover_data = api.download_cover(cover_url, cover_cache)
+        return output.prepare_cover(cover_data, self.config.cover_max_width, self.config.cover_max_height)
+
+    def _check_update(self, manifest, base_path):
+        """
+        对比章节清单，输出新增/变化/删除的章节数
+        :param manifest: 上次保存的清单，None表示首次下载
+        :param base_path: 输出文件所在目录
+        :return: 无任何变化且输出文件仍在时返回该文件，否则None
+        """
+        if manifest is None:
+            self._log("未找到章节清单，完整下载")
+            return None
+
+        old = manifest.get('chapters', {})
+        old_failed = set(manifest.get('failed', []))
+        current = self.chapter_data.by_id
+        added = [c for c in current if c not in old and c not in old_failed]
+        changed = [c for c in current if c in old and old[c] != current[c].fingerprint]
+        removed = [c for c in old if c not in current]
+        retry = [c for c in current if c in old_failed]
+        locked = [c for c in manifest.get('locked', []) if c in current and c not in changed]
+        self._log(f"增量更新：新增{len(added)}章，变化{len(changed)}章，删除{len(removed)}章，"
+                  f"重新获取上次失败的{len(retry)}章，未购买或被锁且未变化{len(locked)}章")
+
+        if added or changed or removed or retry:
+            return None
+        if manifest.get('options') != self.config.output_options():
+            self._log("输出选项已改变，使用缓存重新生成")
+            return None
+        output_file = manifest.get('output_file', '')
+        if not output_file or not os.path.exists(os.path.join(base_path, output_file)):
+            return None
+        return output_file
+
+    def _save_manifest(self, path, output_file):
+        """
+        保存本次的章节清单：加载失败的章节不记录，下次更新时重新获取；
+        未购买或被锁的章节连同指纹记入locked，指纹（含锁定状态）不变时不会触发重新生成
+        """
+        failed = set(self.fail_info)
+        chapters = {}
+        failed_ids = []
+        locked_ids = []
+        for c in self.chapter_data.chapters:
+            if c.chapter_id in self.unavailable:
+                locked_ids.append(c.chapter_id)
+            elif c.chapter_id.zfill(self.chapter_data.fill_num) in failed:
+                failed_ids.append(c.chapter_id)
+                continue
+            chapters[c.chapter_id] = c.fingerprint
+        output.save_manifest(path, {
+            'novel_id': self.novel_info.novel_id,
+            'output_file': os.path.basename(output_file),
+            'options': self.config.output_options(),
+            'chapters': chapters,
+            'failed': failed_ids,
+            'locked': locked_ids,
+        })
 
     def download_novel(self, url, threadnum=None):
         """
@@ -69,13 +531,43 @@ class NovelDownloader:
         """
         self.reset()
         threadnum = threadnum or self.config.thread_num
+        api.configure_pool(threadnum)
+        configure_network(self.config, changed_only=True)
+        pool_base = api.get_pool_stats()
+        retry_base = api.get_retry_stats()
+        # 所有文件都写到明确的路径下，不依赖也不改变进程的工作目录
+        base_path = os.path.abspath(self.config.output_dir or os.getcwd())
+        os.makedirs(base_path, exist_ok=True)
+        if self.config.use_cache:
+            cache_path = self.config.cache_path or os.path.join(base_path, '.jjcache', 'chapters.db')
+            self.cache = open_chapter_cache(cache_path, self.config.cache_max_mb * 1024 * 1024)
+            cache_base = self.cache.stats()
+
+        # 信息与封面缓存放在章节缓存所在目录
+        cache_dir = os.path.dirname(self.config.cache_path) if self.config.cache_path \
+            else os.path.join(base_path, '.jjcache')
+        metadata_cache = None
+        if self.config.metadata_cache:
+            metadata_cache = open_metadata_cache(os.path.join(cache_dir, 'metadata.db'))
+            metadata_base = metadata_cache.stats()
 
         # 解析小说ID
         nid = url.split('=')[1]
 
         # 获取小说信息
         self._log("正在获取小说信息...")
-        apicont, cdic, ress = api.fetch_novel_info(nid)
+        apicont, cdic, ress = api.fetch_novel_info(
+            nid, job=id(self), web_page=self.config.special_intro, cache=metadata_cache,
+            ttl={'novelbasicinfo': self.config.info_ttl, 'chapterList': self.config.chapter_list_ttl}
+        )
+        if metadata_cache is not None:
+            stats = _stats_delta(metadata_cache.stats(), metadata_base)
+            total = stats['fresh'] + stats['revalidated'] + stats['unchanged'] + stats['misses']
+            if total:
+                self._log(f"信息缓存：有效期内{stats['fresh']}，验证未变{stats['revalidated']}，"
+                          f"内容未变{stats['unchanged']}，未命中{stats['misses']}，"
+                          f"命中率{100 * (stats['fresh'] + stats['revalidated']) // total}%，"
+                          f"少传输{stats['saved_bytes'] / 1024:.0f}KB")
 
         if "message" in apicont and "novelIntro" not in apicont:
             return False, None, apicont.get("message", "获取小说信息失败")
@@ -98,7 +590,7 @@ class NovelDownloader:
         # 解析章节列表
         self.chapter_data, loc = chapter.parse_chapters(cdic, nid, self.config)
         info.locked_chapters = loc
-        total_chapters = len(self.chapter_data.href_list)
+        total_chapters = len(self.chapter_data)
         info.chapter_count = total_chapters
 
         self._log(f"总章节数：{total_chapters}")
@@ -111,74 +603,138 @@ class NovelDownloader:
         if ch_start > 0 or ch_end > 0:
             start_idx = max(0, ch_start - 1) if ch_start > 0 else 0
             end_idx = min(ch_end, total_chapters) if ch_end > 0 else total_chapters
-            self.chapter_data.href_list = self.chapter_data.href_list[start_idx:end_idx]
-            self.chapter_data.titleindex = self.chapter_data.titleindex[start_idx:end_idx]
-            self.chapter_data.summary_list = self.chapter_data.summary_list[start_idx:end_idx]
+            self.chapter_data.select(start_idx, end_idx)
             self._log(f"选定范围：第{start_idx+1}章 ~ 第{end_idx}章")
 
-        section_ct = len(self.chapter_data.href_list)
+        section_ct = len(self.chapter_data)
         self._log(f"待下载章节数：{section_ct}")
 
         # 准备输出目录
         ti = utils.sanitize_filename(ti) + '.' + nid
-        base_path = os.getcwd()
 
-        output_dir = os.path.join(base_path, ti)
-        if not os.path.exists(output_dir):
-            os.mkdir(output_dir)
-        os.chdir(output_dir)
+        # 增量更新：对比上次的章节清单
+        manifest_path = os.path.join(base_path, ti + '.manifest.json')
+        if self.config.update_mode:
+            if self.cache is None:
+                self._log("增量更新需要章节缓存，已临时开启")
+                cache_path = self.config.cache_path or os.path.join(cache_dir, 'chapters.db')
+                self.cache = open_chapter_cache(cache_path, self.config.cache_max_mb * 1024 * 1024)
+                cache_base = self.cache.stats()
+            manifest = output.load_manifest(manifest_path)
+            unchanged_file = self._check_update(manifest, base_path)
+            if unchanged_file:
+                self._log(f"没有新增或变化的章节，沿用：{unchanged_file}")
+                # 沿用的文件中未购买或被锁的章节仍然缺失
+                self.fail_info = sorted(c.zfill(self.chapter_data.fill_num) for c in manifest.get('locked', [])
+                                        if self.chapter_data.get(c))
+                self.percent = section_ct
+                self._update_progress(section_ct, section_ct)
+                return True, unchanged_file, None
 
-        # 保存卷标
-        output.save_volume_files(self.chapter_data, self.config, output_dir)
+        # 封面在后台下载、转换，与章节下载同时进行，打包前写入
+        cover = None
+        cover_cache = None
+        if self.config.add_cover and self.config.format_type != "txt":
+            if self.config.cover_cache:
+                cover_cache = open_cover_cache(os.path.join(cache_dir, 'covers'),
+                                               self.config.cover_cache_mb * 1024 * 1024)
+                cover_base = cover_cache.stats()
+            cover = api.submit_background(self._prepare_cover, info.cover_url, cover_cache)
 
-        # 构建目录
-        chapter.build_index(self.chapter_data, loc, self.config)
+        self.filenames = output.chapter_filenames(self.chapter_data, self.config)
+        done = {}
+        if self.config.format_type == "txt" and self.config.save_per_chapter:
+            output_dir = os.path.join(base_path, ti)
+            self.journal = output.ChapterJournal(output_dir)
+            journal_header = {'novel_id': nid, 'options': self.config.output_options()}
+            if os.path.exists(output_dir):
+                if self.config.resume:
+                    # 章节列表有变化时，只沿用仍存在且文件名未变的章节
+                    done = {cid: entry for cid, entry in self.journal.load(journal_header).items()
+                            if self.chapter_data.get(cid) and entry.get('file') == self.filenames[cid]}
+                if not done:
+                    output.clear_staging_dir(output_dir, self.filenames.values())
+            else:
+                os.mkdir(output_dir)
+            self.journal.start(journal_header, done)
+            self.writer = output.DirectoryWriter(output_dir)
+        elif self.config.format_type == "txt":
+            # 按顺序直接写入最终文件；中断后续传依靠章节缓存
+            output_file = ti + ".txt"
+            self.writer = output.create_txt(
+                os.path.join(base_path, output_file), self.chapter_data, self.filenames, self.config
+            )
+        else:
+            # epub直接写入zip，不经过暂存目录；中断后续传依靠章节缓存
+            output_file = ti + ".epub"
+            self.writer = output.create_epub(os.path.join(base_path, output_file), self.config)
 
-        # 保存封面
-        if self.config.add_cover and self.config.format_type != "txt":
-            cover_data = api.download_cover(info.cover_url)
-            if not output.save_cover(cover_data, output_dir):
-                self._log("【封面下载失败或为默认封面】")
+        # 从创建输出到完成文件之间出错或中断时放弃输出，删除临时文件并结束写入线程
+        try:
+            # 保存卷标
+            output.save_volume_files(self.chapter_data, self.config, self.writer)
 
-        # 保存信息页
-        output.save_info_page(info, loc, self.config, output_dir, url)
+            # 构建目录
+            chapter.build_index(self.chapter_data, loc, self.config)
 
-        # 多线程下载章节
-        self._log("开始下载章节...")
-        with concurrent.futures.ThreadPoolExecutor(max_workers=threadnum) as executor:
-            futures = {
-                executor.submit(self._download_and_save_chapter, u): u
-                for u in self.chapter_data.href_list
-            }
-            for future in concurrent.futures.as_completed(futures):
-                self._update_progress(self.percent, section_ct)
+            # 保存信息页
+            output.save_info_page(info, loc, self.config, self.writer, url)
+
+            # 多线程下载章节
+            pending = [c for c in self.chapter_data.chapters if c.chapter_id not in done]
+            self.percent = len(done)
+            if self.percent:
+                self._log(f"续传：跳过已完成的{self.percent}章")
+            self._log("开始下载章节...")
+            self._download_chapters(pending, threadnum, section_ct)
+
+            self._log(f'\n下载完成，总进度：{self.percent}/{section_ct}')
+            if self.limiter:
+                self._log(f"最终并发数：{self.limiter.limit}")
+            stats = _stats_delta(api.get_pool_stats(), pool_base)
+            self._log(f"连接数：新建{stats['opened']}，复用{stats['reused']}")
+            stats = _stats_delta(api.get_retry_stats(), retry_base)
+            self._log(f"请求数：{stats['requests']}，重试{stats['retries']}次，熔断{stats['breaker_trips']}次")
+            if self.cache:
+                stats = _stats_delta(self.cache.stats(), cache_base)
+                self._log(f"章节缓存：命中{stats['hits']}，未命中{stats['misses']}")
 
-        self._log(f'\n下载完成，总进度：{self.percent}/{section_ct}')
-
-        # 显示失败章节
-        if self.fail_info:
-            self.fail_info.sort()
-            self._log(f"\n未购买或加载失败章节：\n{'|'.join(self.fail_info)}")
-
-        # 生成最终文件
-        os.chdir(base_path)
-        if self.config.format_type == "txt":
-            if self.config.save_per_chapter:
-                # 按章保存：重命名临时文件到可读文件名
-                output.rename_chapter_files(output_dir, self.chapter_data, self.config)
-                output_file = output_dir
-                self._log(f"\ntxt按章保存完成，目录：{output_dir}")
+            # 显示失败章节
+            if self.fail_info:
+                self.fail_info.sort()
+                self._log(f"\n未购买或加载失败章节：\n{'|'.join(self.fail_info)}")
+
+            # 生成最终文件
+            if self.config.format_type == "txt":
+                if self.config.save_per_chapter:
+                    # 按章保存：章节已直接写为最终文件名
+                    self.journal.remove()
+                    output_file = output_dir
+                    self._log(f"\ntxt按章保存完成，目录：{output_dir}")
+                else:
+                    self.writer.close()
+                    self._log("\ntxt文件整合完成")
             else:
-                output_file = ti + ".txt"
-                output.merge_txt_files(output_dir, output_file)
-                self._log("\ntxt文件整合完成")
-        else:
-            output_file = ti + ".epub"
-            output.create_epub(
-                output_file, info.author, info.title, ti,
-                self.chapter_data.index, self.chapter_data.roll_sign,
-                base_path, self.config
-            )
-            self._log("\nepub打包完成")
+                if cover is not None and not output.save_cover(cover.result(), self.writer):
+                    self._log("【封面下载失败或为默认封面】")
+                if cover_cache is not None:
+                    stats = _stats_delta(cover_cache.stats(), cover_base)
+                    self._log(f"封面缓存：命中{stats['hits']}，未命中{stats['misses']}")
+                start = time.monotonic()
+                self.writer.close(info.author, info.title, self.chapter_data, self.filenames)
+                stats = self.writer.stats()
+                self._log(f"\nepub打包完成，收尾用时{time.monotonic() - start:.2f}秒")
+                self._log(f"压缩：{stats['files']}个文件，{stats['bytes'] / 1048576:.1f}MB→"
+                          f"{stats['compressed'] / 1048576:.1f}MB，级别{self.writer.level}，"
+                          f"{self.writer.workers}线程累计{stats['seconds']:.2f}秒")
+        except BaseException:
+            self.writer.abort()
+            raise
+        finally:
+            if self.journal is not None:
+                self.journal.close()
+
+        if self.config.update_mode:
+            self._save_manifest(manifest_path, output_file)
 
         return True, output_file, None
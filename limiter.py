@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+"""
+并发控制模块
+AIMD自适应并发限制：请求健康时逐步放大同时进行的章节请求数，出现失败或延迟升高时减半
+"""
+import time
+import threading
+
+
+class AdaptiveLimiter:
+    """
+    AIMD自适应并发限制器
+    慢启动阶段每次成功+1，首次拥塞后改为每轮(limit次成功)+1；
+    章节请求发生重试或延迟超过基线latency_tolerance倍时视为拥塞，limit减半，
+    两次减半之间至少间隔一个平均延迟，避免同一批失败反复减半
+    """
+    def __init__(self, max_limit, initial=None, min_limit=1, latency_tolerance=2.0):
+        """
+        :param max_limit: 并发上限（即线程/协程数）
+        :param initial: 初始并发数，None为max_limit的1/4
+        :param min_limit: 并发下限
+        :param latency_tolerance: 延迟超过基线多少倍视为拥塞
+        """
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        if initial is None:
+            initial = self.max_limit // 4
+        self._limit = float(min(self.max_limit, max(self.min_limit, int(initial))))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._slow_start = True
+        self._baseline = None  # 最低平滑延迟
+        self._ewma = None  # 平滑延迟
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """当前并发限制"""
+        return int(self._limit)
+
+    def try_acquire(self):
+        """非阻塞获取一个并发名额"""
+        with self._cond:
+            if self.in_flight < int(self._limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """阻塞直到获取一个并发名额（线程引擎）"""
+        with self._cond:
+            while self.in_flight >= int(self._limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self, cond):
+        """
+        在事件循环内等待并发名额（asyncio引擎）
+        :param cond: 同一事件循环的asyncio.Condition，release_async时通知
+        """
+        async with cond:
+            await cond.wait_for(self.try_acquire)
+
+    def release(self, ok, latency):
+        """
+        释放名额并根据结果调整并发限制
+        :param ok: 请求是否健康（无重试）
+        :param latency: 本次请求耗时(秒)
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self._adjust(ok, latency)
+            self._cond.notify_all()
+
+    async def release_async(self, cond, ok, latency):
+        """release的asyncio版本"""
+        self.release(ok, latency)
+        async with cond:
+            cond.notify_all()
+
+    def _adjust(self, ok, latency):
+        if ok:
+            self._ewma = latency if self._ewma is None else 0.8 * self._ewma + 0.2 * latency
+            if self._baseline is None or self._ewma < self._baseline:
+                self._baseline = self._ewma
+            if self._ewma > self._baseline * self.latency_tolerance:
+                ok = False
+
+        if ok:
+            if self._slow_start:
+                self._limit += 1
+            else:
+                self._limit += 1 / self._limit
+            self._limit = min(self._limit, self.max_limit)
+            return
+
+        now = time.monotonic()
+        if now - self._last_decrease < (self._ewma or 0):
+            return
+        self._last_decrease = now
+        self._slow_start = False
+        self._limit = max(self.min_limit, self._limit / 2)
+        # 延迟回落后以当前值为新基线，避免长期困在下限
+        self._baseline = self._ewma
@@ -14,7 +14,7 @@ from ttkbootstrap.scrolled import ScrolledText
 from tkinter import messagebox
 
 from models import DownloadConfig
-from downloader import NovelDownloader
+from downloader import NovelDownloader, configure_network, network_config
 
 _BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE = os.path.join(_BASE_DIR, 'config.yml')
@@ -206,6 +206,7 @@ class App(ttk.Window):
             conf = yaml.load(f.read(), Loader=yaml.FullLoader)
         if not conf:
             return
+        configure_network(network_config(conf))
 
         self.var_token.set(conf.get('token', ''))
         self.var_thread.set(str(conf.get('ThreadPoolMaxNum', 100)))
@@ -333,9 +334,12 @@ class App(ttk.Window):
         self.log_text.see(tk.END)
         self.log_text.configure(state=tk.DISABLED)
 
-    def _on_progress(self, percent, current, total):
+    def _on_progress(self, percent, current, total, concurrency=None):
         self.progress['value'] = percent
-        self.lbl_progress.configure(text=f'{current}/{total} ({percent}%)')
+        text = f'{current}/{total} ({percent}%)'
+        if concurrency:
+            text += f'  并发：{concurrency}'
+        self.lbl_progress.configure(text=text)
 
     def _start_download(self):
         if self._downloading:
@@ -358,7 +362,7 @@ class App(ttk.Window):
         config = self._build_config()
         downloader = NovelDownloader(
             config=config,
-            progress_callback=lambda p, c, t: self.after(0, self._on_progress, p, c, t),
+            progress_callback=lambda p, c, t, n: self.after(0, self._on_progress, p, c, t, n),
             log_callback=lambda m: self.after(0, self._on_log, m),
         )
 
@@ -22,12 +22,48 @@ class DownloadConfig:
         self.custom_title = ''
         self.custom_vol = ''
         self.css_text = ''
-        self.thread_num = 100
+        self.thread_num = 100  # 线程数；开启自适应并发时为并发上限
+        self.adaptive_concurrency = True  # AIMD自适应并发
+        self.cpu_workers = 0  # 解密与格式化的进程数(0表示在下载线程内处理)
+        self.cpu_batch_size = 16  # 每批交给进程池的章节数
+        self.engine = 'thread'  # 章节下载引擎: thread(线程池), async(asyncio，需安装aiohttp)
+        self.retry_attempts = 100  # 章节请求最多尝试次数(含首次请求)
+        self.retry_base_delay = 0.5  # 重试退避基数(秒)，按2的幂增长并加随机抖动
+        self.retry_max_delay = 30.0  # 单次重试最长等待(秒)
+        self.request_timeout = 15.0  # 单次章节请求超时(秒)
+        self.breaker_threshold = 0.5  # 熔断错误率阈值(0表示关闭熔断)
+        self.breaker_cooldown = 10.0  # 熔断暂停时长(秒)
+        self.rate_limit = 0  # API每秒请求数上限，进程内所有下载共享(0表示不限速)
+        self.rate_burst = 10  # 限速突发上限
+        self.output_dir = ''  # 输出目录(空为当前目录)
+        self.use_cache = False  # 缓存已解密章节，重复导出时不再请求(命令行版默认开启，增量更新时自动开启)
+        self.cache_path = ''  # 缓存数据库路径(空为输出目录下.jjcache/chapters.db)
+        self.cache_max_mb = 512  # 缓存大小上限(MB)
+        self.metadata_cache = False  # 缓存小说信息与章节列表，过期后用ETag/Last-Modified验证(与章节缓存同目录)
+        self.info_ttl = 3600  # 小说信息缓存有效期(秒)，期内不再请求
+        self.chapter_list_ttl = 60  # 章节列表缓存有效期(秒)，0为每次都向服务器验证
+        self.cover_cache = False  # 按网址缓存封面图片(与章节缓存同目录)
+        self.cover_cache_mb = 64  # 封面缓存大小上限(MB)
+        self.cover_max_width = 0  # 封面最大宽度(像素，0为不限)，超出时按比例缩小
+        self.cover_max_height = 0  # 封面最大高度(像素，0为不限)
+        self.resume = True  # 续传：按章保存时沿用目录中日志记录且校验通过的章节，其余依靠章节缓存
+        self.update_mode = False  # 增量更新：对比上次的章节清单，只获取新增或变化的章节
         self.chapter_start = 0  # 起始章节号(0表示从头开始)
         self.chapter_end = 0  # 结束章节号(0表示到最后)
+        self.compress_level = 6  # epub压缩级别(0不压缩，1最快，9最小)
+        self.compress_workers = 0  # epub并行压缩线程数(0为CPU核数)
+        self.reorder_buffer = 256  # txt按顺序写入时最多提前完成的章节数
         self.save_per_chapter = False  # 按章保存(仅txt)
         self.remove_blank_lines = False  # 去除段间空行(仅txt)
 
+    def output_options(self):
+        """影响输出内容的选项，用于判断增量更新时能否沿用上次的结果"""
+        keys = ('format_type', 'state', 'show_number', 'show_title', 'show_summary',
+                'show_chinfo', 'del_thanks', 'add_cover', 'html_vol', 'special_intro',
+                'custom_title', 'custom_vol', 'css_text', 'chapter_start', 'chapter_end',
+                'save_per_chapter', 'remove_blank_lines', 'cover_max_width', 'cover_max_height')
+        return {k: getattr(self, k) for k in keys}
+
 
 class NovelInfo:
     """小说信息类"""
@@ -43,13 +79,47 @@ class NovelInfo:
         self.ress = None  # 网页解析结果
 
 
+class ChapterRecord:
+    """单个章节"""
+    __slots__ = ('chapter_id', 'url', 'title', 'summary', 'locked', 'fingerprint')
+
+    def __init__(self, chapter_id, url, title='', summary='', locked=False, fingerprint=''):
+        self.chapter_id = chapter_id  # 章节ID
+        self.url = url  # 章节API链接
+        self.title = title  # 章节标题
+        self.summary = summary  # 内容提要
+        self.locked = locked  # 是否被锁
+        self.fingerprint = fingerprint  # 章节列表元数据指纹
+
+
 class ChapterData:
     """章节数据类"""
     def __init__(self):
-        self.href_list = []  # 章节链接
-        self.titleindex = []  # 章节标题
-        self.summary_list = []  # 内容提要
+        self.chapters = []  # ChapterRecord，按章节顺序
+        self.by_id = {}  # 章节ID -> ChapterRecord
         self.roll_sign = []  # 卷标
         self.roll_sign_place = []  # 卷标位置
         self.index = []  # 目录
         self.fill_num = 0  # 章节填充位数
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def add(self, record):
+        """追加章节"""
+        self.chapters.append(record)
+        self.by_id[record.chapter_id] = record
+
+    def get(self, chapter_id):
+        """按章节ID查找，不存在返回None"""
+        return self.by_id.get(chapter_id)
+
+    def select(self, start_idx, end_idx):
+        """只保留[start_idx, end_idx)范围内的章节"""
+        self.chapters = self.chapters[start_idx:end_idx]
+        self.by_id = {c.chapter_id: c for c in self.chapters}
+
+    @property
+    def locked_ids(self):
+        """被锁章节ID"""
+        return [c.chapter_id for c in self.chapters if c.locked]
@@ -6,68 +6,231 @@
 import re
 import os
 import html
-import shutil
-import zipfile
-from lxml import etree
-from PIL import Image
+import json
+import hashlib
+import threading
+import time
+import queue
+import concurrent.futures
 from io import BytesIO
 
-import EPUB2
-import EPUB3
 import utils
 from models import DownloadConfig, NovelInfo, ChapterData
 
 
-def save_chapter_file(chapter_url, title, content, config):
+def volume_filename(place, ext):
     """
-    保存单个章节到文件
-    :param chapter_url: 章节URL（用于提取章节号）
+    卷标文件名，排在卷内第一章之前
+    :param place: 卷标位置（卷内第一章的章节ID）
+    :param ext: 扩展名
+    """
+    return 'z' + str(int(place.strip()) - 1).zfill(4) + '_vol' + ext
+
+
+def chapter_filenames(chapter_data, config):
+    """
+    预先计算每章的文件名
+    合并输出时为按章节号排序的z0001.txt/z0001.xhtml；
+    txt按章保存时直接使用繁简转换后的章节标题，与卷标、信息页或前面章节重名时沿用z0001.txt
+    :param chapter_data: ChapterData
+    :param config: DownloadConfig
+    :return: {章节ID: 文件名}
+    """
+    ext = '.txt' if config.format_type == 'txt' else '.xhtml'
+    names = {c.chapter_id: 'z' + c.chapter_id.zfill(4) + ext for c in chapter_data.chapters}
+    if config.format_type != 'txt' or not config.save_per_chapter:
+        return names
+
+    used = set(names.values())
+    used.add('info.txt')
+    used.update(volume_filename(p, '.txt') for p in chapter_data.roll_sign_place)
+    for record in chapter_data.chapters:
+        filename = utils.sanitize_filename(utils.convert_text(record.title, config.state)) + '.txt'
+        if filename not in used:
+            used.add(filename)
+            names[record.chapter_id] = filename
+    return names
+
+
+def chapter_document(title, content, config):
+    """
+    章节文件内容，epub为完整的xhtml页面
     :param title: 章节标题
     :param content: 格式化后的内容
     :param config: DownloadConfig
+    :return: 文本
     """
-    titleOrigin = chapter_url.split('=')
-    chap_num = titleOrigin[2].zfill(4)
-
     if config.format_type == 'txt':
-        filename = "z" + chap_num + ".txt"
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(content)
-    else:
-        filename = "z" + chap_num + ".xhtml"
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write('''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+        return content
+    return '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN"
 "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
 <html xmlns="http://www.w3.org/1999/xhtml">
 <head><title>''' + re.sub('<.*?>', '', title) + '''</title>
 <meta charset="utf-8"/>
 <link href="sgc-nav.css" rel="stylesheet" type="text/css"/>
-</head><body>''')
-            f.write(content)
+</head><body>''' + content
 
 
-def save_volume_files(chapter_data, config, output_dir):
+class ChapterWriter:
+    """
+    输出写入器：章节、卷标、封面、信息页都以(文件名, 内容)交给write
+    """
+    def write(self, filename, data):
+        raise NotImplementedError
+
+    def ready(self, filename):
+        """该文件现在能否写入而不超出缓冲（供asyncio引擎判断）"""
+        return True
+
+    def wait_ready(self, filename):
+        """阻塞到该文件可以写入或已放弃写入（线程引擎在请求章节前调用）"""
+
+    def abort(self):
+        """下载出错或中断时调用，可重复调用"""
+
+
+class DirectoryWriter(ChapterWriter):
+    """
+    把章节、卷标、信息页等文件写入目录（txt按章保存）
+    先写临时文件再替换，中断时不会留下半截文件
+    """
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+
+    def write(self, filename, data):
+        """
+        :param filename: 文件名
+        :param data: str或bytes，str按系统换行写入（与文本模式一致）
+        :return: (size, md5) 写入内容的大小和摘要，供续传日志校验
+        """
+        if isinstance(data, str):
+            data = data.replace('\n', os.linesep).encode('utf-8')
+        path = os.path.join(self.output_dir, filename)
+        tmp = path + '.part'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data), hashlib.md5(data).hexdigest()
+
+
+class ChapterJournal:
+    """
+    已完成章节的追加式日志，保存在暂存目录中
+    首行记录输出选项，之后每行一个已写入的章节文件，用于中断后续传
+    """
+    NAME = '.journal'
+
+    def __init__(self, output_dir):
+        self.path = os.path.join(output_dir, self.NAME)
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self, header):
+        """
+        读取日志并校验已完成的章节文件
+        :param header: 本次的输出选项，与日志首行不一致时日志作废
+        :return: {章节ID: 日志记录}，仅包含文件完整的章节
+        """
+        if not os.path.exists(self.path):
+            return {}
+        done = {}
+        with open(self.path, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            if not lines or json.loads(lines[0]) != header:
+                return {}
+        except ValueError:
+            return {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # 中断时写了一半的行
+                continue
+            if self._verify(entry):
+                done[entry['id']] = entry
+            else:
+                done.pop(entry.get('id'), None)
+        return done
+
+    def _verify(self, entry):
+        filepath = os.path.join(self.output_dir, entry.get('file', ''))
+        try:
+            if os.path.getsize(filepath) != entry['size']:
+                return False
+            with open(filepath, 'rb') as f:
+                return hashlib.md5(f.read()).hexdigest() == entry['md5']
+        except (OSError, KeyError):
+            return False
+
+    def start(self, header, done):
+        """
+        重写日志：首行为输出选项，并保留校验通过的记录
+        :param header: 输出选项
+        :param done: load返回的已完成章节
+        """
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + '\n')
+            for entry in done.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def record(self, chap_id, filename, size, digest):
+        """追加一条已完成记录，整行一次写入并立即落盘"""
+        line = json.dumps({'id': chap_id, 'file': filename, 'size': size, 'md5': digest},
+                          ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# 暂存目录中由下载流程生成的文件
+_STAGING_FILE = re.compile(r'^(z\d+(_vol)?\.(txt|xhtml)|zp\.jpg|C\.xhtml|info\.(txt|xhtml)|\.journal(\.tmp)?|.*\.part)$')
+
+
+def clear_staging_dir(output_dir, filenames=()):
+    """
+    清除暂存目录中上次下载留下的文件（不续传时使用），其他文件保留
+    :param output_dir: 暂存目录
+    :param filenames: 本次将写入的章节文件名（按章保存时为章节标题）
+    """
+    filenames = set(filenames)
+    for filename in os.listdir(output_dir):
+        if _STAGING_FILE.match(filename) or filename in filenames:
+            os.remove(os.path.join(output_dir, filename))
+
+
+def save_volume_files(chapter_data, config, writer):
     """
     保存卷标文件
     :param chapter_data: ChapterData
     :param config: DownloadConfig
-    :param output_dir: 输出目录
+    :param writer: DirectoryWriter或EpubWriter
     """
+    roll_sign = [utils.convert_text(v, config.state) for v in chapter_data.roll_sign]
     for vol in range(len(chapter_data.roll_sign_place)):
         chapter_data.roll_sign_place[vol] = chapter_data.roll_sign_place[vol].strip()
         volt = chapter_data.roll_sign_place[vol]
-        ros = chapter_data.roll_sign[vol]
-        ros = utils.convert_text(ros, config.state)
+        ros = roll_sign[vol]
 
         if config.format_type == "txt":
-            nm = 'z' + str(int(volt) - 1).zfill(4) + '_vol.txt'
-            with open(os.path.join(output_dir, nm), 'w', encoding='utf-8') as f:
-                f.write('\n\n' + ros + '\n')
+            writer.write(volume_filename(volt, '.txt'), '\n\n' + ros + '\n')
         else:
-            nm = 'z' + str(int(volt) - 1).zfill(4) + '_vol.xhtml'
-            with open(os.path.join(output_dir, nm), 'w', encoding='utf-8') as f:
-                f.write(f'''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+            writer.write(volume_filename(volt, '.xhtml'), f'''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN"
 "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
 <html xmlns="http://www.w3.org/1999/xhtml">
@@ -76,22 +239,52 @@ def save_volume_files(chapter_data, config, output_dir):
 <body><h1>{ros}</h1></body></html>''')
 
 
-def save_cover(cover_data, output_dir):
+def prepare_cover(cover_data, max_width=0, max_height=0):
     """
-    保存封面图片和封面页
+    把封面转为JPEG：已是JPEG且不超出尺寸时原样使用，不解码；否则用Pillow缩小并重新编码
     :param cover_data: 封面图片二进制数据
-    :param output_dir: 输出目录
-    :return: 是否成功
+    :param max_width: 最大宽度(像素)，0为不限
+    :param max_height: 最大高度(像素)，0为不限
+    :return: JPEG数据，无法识别时返回None
     """
     if not cover_data:
-        return False
+        return None
+    is_jpeg = cover_data[:3] == b'\xff\xd8\xff'
+    if is_jpeg and not (max_width or max_height):
+        return cover_data
 
     try:
+        from PIL import Image
+
         im = Image.open(BytesIO(cover_data))
-        im.save(os.path.join(output_dir, 'zp.jpg'), 'JPEG')
+        size = (max_width or im.width, max_height or im.height)
+        if im.width > size[0] or im.height > size[1]:
+            im.thumbnail(size, Image.LANCZOS)
+        elif is_jpeg:
+            return cover_data
+        if im.mode not in ('RGB', 'L'):
+            im = im.convert('RGB')
+        buf = BytesIO()
+        im.save(buf, 'JPEG')
+        return buf.getvalue()
+    except Exception:
+        return None
+
 
-        with open(os.path.join(output_dir, "C.xhtml"), 'w', encoding='utf-8') as f:
-            f.write('''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+def save_cover(cover_jpeg, writer):
+    """
+    保存封面图片和封面页
+    :param cover_jpeg: prepare_cover返回的JPEG数据
+    :param writer: DirectoryWriter或EpubWriter
+    :return: 是否成功
+    """
+    if not cover_jpeg:
+        return False
+
+    try:
+        writer.write('zp.jpg', cover_jpeg)
+
+        writer.write("C.xhtml", '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN"
 "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
 <html xmlns="http://www.w3.org/1999/xhtml">
@@ -104,13 +297,20 @@ def save_cover(cover_data, output_dir):
         return False
 
 
-def save_info_page(novel_info, loc, config, output_dir, req_url):
+def _intro_markup(node):
+    """网页文案节点的HTML，只在special_intro时需要lxml"""
+    from lxml import etree
+
+    return etree.tostring(node, encoding="utf-8").decode()
+
+
+def save_info_page(novel_info, loc, config, writer, req_url):
     """
     保存信息页
     :param novel_info: NovelInfo
     :param loc: 锁定章节列表
     :param config: DownloadConfig
-    :param output_dir: 输出目录
+    :param writer: DirectoryWriter或EpubWriter
     :param req_url: 原始请求URL
     """
     apicont = novel_info.apicont
@@ -162,7 +362,7 @@ def save_info_page(novel_info, loc, config, output_dir, req_url):
             TOC += ix + "\n"
         TOC += "文案：\n"
         if config.special_intro and intro:
-            v = etree.tostring(intro[0], encoding="utf-8").decode()
+            v = _intro_markup(intro[0])
             TOC += v
         else:
             for nx in intro:
@@ -173,9 +373,7 @@ def save_info_page(novel_info, loc, config, output_dir, req_url):
             v = utils.unescape_html(v)
             TOC += re.sub("<.*?>", "", v) + '\n'
         TOC = utils.convert_text(TOC, config.state)
-        with open(os.path.join(output_dir, "info.txt"), 'w', encoding='utf-8') as fo:
-            fo.write(TOC.strip() + '\n')
-            fo.write(lockinfo.strip() + '\n')
+        writer.write("info.txt", TOC.strip() + '\n' + lockinfo.strip() + '\n')
     else:
         TOC = f"<h1 class='title' title='{xtitle}-{xaut}'><a href='{req_url}'>{xtitle}</a></h1>"
         TOC += f"<h2 class='sigil_not_in_toc title'>作者：<a href='{xauthref}'>{xaut}</a></h2>"
@@ -187,7 +385,7 @@ def save_info_page(novel_info, loc, config, output_dir, req_url):
         TOC += "</blockquote>"
         TOC += "<hr/><p><b>文案：</b></p>"
         if config.special_intro and intro:
-            v = etree.tostring(intro[0], encoding="utf-8").decode()
+            v = _intro_markup(intro[0])
             TOC += v
         else:
             for nx in intro:
@@ -200,8 +398,7 @@ def save_info_page(novel_info, loc, config, output_dir, req_url):
             v = re.sub("其它：", "<b>其它：</b>", v)
             TOC += "<p>" + v + "</p>"
         TOC = utils.convert_text(TOC, config.state)
-        with open(os.path.join(output_dir, "info.xhtml"), 'w', encoding='utf-8') as fo:
-            fo.write('''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
+        writer.write("info.xhtml", '''<?xml version="1.0" encoding="UTF-8" standalone="no" ?>
 <!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.1//EN"
 "http://www.w3.org/TR/xhtml11/DTD/xhtml11.dtd">
 <html xmlns="http://www.w3.org/1999/xhtml">
@@ -210,78 +407,277 @@ def save_info_page(novel_info, loc, config, output_dir, req_url):
 <body>''' + TOC + lockinfo + '''</body></html>''')
 
 
-def rename_chapter_files(source_dir, chapter_data, config):
+def load_manifest(path):
+    """
+    读取增量更新清单
+    :param path: 清单文件路径
+    :return: dict，不存在或损坏时返回None
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path, manifest):
+    """
+    原子写入增量更新清单
+    :param path: 清单文件路径
+    :param manifest: dict
+    """
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def document_order(chapter_data, filenames, ext):
     """
-    按章保存模式：将临时文件重命名为可读的章节文件名
-    :param source_dir: 源目录
+    按章节元数据排出章节与卷标文件的顺序：卷标插在卷内第一章之前，之后没有章节的卷标放在最后
     :param chapter_data: ChapterData
-    :param config: DownloadConfig
+    :param filenames: chapter_filenames的结果
+    :param ext: 卷标文件扩展名
+    :return: [(文件名, 类型, 目录标题)]，类型为volume/chapter，目录标题为卷标或build_index的目录项
     """
-    import utils
-    filenames = sorted(os.listdir(source_dir))
-    for filename in filenames:
-        if not filename.endswith('.txt'):
-            continue
-        # 跳过 info.txt 和卷标文件
-        if filename == 'info.txt' or '_vol' in filename:
-            continue
-        filepath = os.path.join(source_dir, filename)
-        # 从文件名提取章节号，如 z0001.txt -> 1
-        base = filename.replace('.txt', '').lstrip('z').lstrip('0') or '0'
-        try:
-            chap_num = int(base)
-        except ValueError:
-            continue
-        # 在href_list中查找对应章节的标题
-        new_name = filename  # fallback
-        for idx, url in enumerate(chapter_data.href_list):
-            url_chap_id = url.split('=')[2]
-            if str(url_chap_id) == str(chap_num):
-                title = chapter_data.titleindex[idx].strip()
-                title = utils.convert_text(title, config.state)
-                title = utils.sanitize_filename(title)
-                new_name = f"{title}.txt"
-                break
-        new_path = os.path.join(source_dir, new_name)
-        if filepath != new_path and not os.path.exists(new_path):
-            os.rename(filepath, new_path)
-
-
-def merge_txt_files(source_dir, output_file):
-    """
-    合并TXT文件
-    :param source_dir: 源目录
-    :param output_file: 输出文件路径
+    volumes = sorted(
+        (int(p.strip()), volume_filename(p, ext), 'volume', label)
+        for p, label in zip(chapter_data.roll_sign_place, chapter_data.roll_sign)
+    )
+    index = chapter_data.index
+    documents = []
+    v = 0
+    for i, record in enumerate(chapter_data.chapters):
+        while v < len(volumes) and volumes[v][0] <= int(record.chapter_id):
+            documents.append(volumes[v][1:])
+            v += 1
+        documents.append((filenames[record.chapter_id], 'chapter', index[i] if i < len(index) else ''))
+    documents.extend(vol[1:] for vol in volumes[v:])
+    return documents
+
+
+class TxtWriter(ChapterWriter):
     """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        filenames = sorted(os.listdir(source_dir))
-        for filename in filenames:
-            filepath = os.path.join(source_dir, filename)
-            for line in open(filepath, encoding='utf-8', errors='ignore'):
-                f.writelines(line)
-    shutil.rmtree(source_dir)
+    流式写入合并的txt：按阅读顺序追加到.part临时文件，下载过程中即可阅读，完成后改名为最终文件；
+    先完成的后续章节暂存在重排缓冲区，轮到时再写出
+    """
+    def __init__(self, output_file, sequence, buffer_size=256):
+        """
+        :param output_file: 输出文件路径，写入期间为.part临时文件
+        :param sequence: 信息页、卷标、章节文件名，按阅读顺序
+        :param buffer_size: 重排缓冲区大小，只有距下一个待写文件buffer_size以内的文件可以写入
+        """
+        self.output_file = output_file
+        self.buffer_size = max(1, buffer_size)
+        self._position = {name: i for i, name in enumerate(sequence)}
+        self._sequence = sequence
+        self._next = 0
+        self._buffer = {}
+        self._aborted = False
+        self._cond = threading.Condition()
+        self._tmp = output_file + '.part'
+        self._file = open(self._tmp, 'w', encoding='utf-8')
+
+    def ready(self, filename):
+        return self._aborted or self._position[filename] < self._next + self.buffer_size
+
+    def wait_ready(self, filename):
+        with self._cond:
+            self._cond.wait_for(lambda: self.ready(filename))
+
+    def write(self, filename, data):
+        """
+        写入一个文件的内容；不是下一个待写文件时放入缓冲区
+        :param filename: 文件名
+        :param data: 文本
+        """
+        # 统一换行，与原先读回章节文件再合并的结果一致（文本模式读取会把\r\n、\r转为\n）
+        data = data.replace('\r\n', '\n').replace('\r', '\n')
+        with self._cond:
+            if self._aborted:
+                return
+            self._buffer[self._position[filename]] = data
+            if self._next in self._buffer:
+                while self._next in self._buffer:
+                    self._file.write(self._buffer.pop(self._next))
+                    self._next += 1
+                self._file.flush()
+                self._cond.notify_all()
 
+    def close(self):
+        """写出缓冲区中剩余的内容（只在有文件缺失时发生），关闭文件并改名为最终文件"""
+        with self._cond:
+            for i in sorted(self._buffer):
+                self._file.write(self._buffer.pop(i))
+            self._next = len(self._sequence)
+            self._file.close()
+            os.replace(self._tmp, self.output_file)
+            self._cond.notify_all()
 
-def create_epub(output_file, author, title, dir_name, index, roll_sign, base_path, config):
+    def abort(self):
+        """放弃写入：丢弃缓冲区并删除临时文件，唤醒等待的线程，之后的写入被忽略"""
+        with self._cond:
+            self._aborted = True
+            self._buffer.clear()
+            self._file.close()
+            if os.path.exists(self._tmp):
+                os.remove(self._tmp)
+            self._cond.notify_all()
+
+
+def create_txt(output_file, chapter_data, filenames, config):
     """
-    创建EPUB文件
+    创建合并的txt文件
     :param output_file: 输出文件路径
-    :param author: 作者
-    :param title: 书名
-    :param dir_name: 目录名
-    :param index: 目录列表
-    :param roll_sign: 卷标列表
-    :param base_path: 基础路径
+    :param chapter_data: ChapterData
+    :param filenames: chapter_filenames的结果
     :param config: DownloadConfig
+    :return: TxtWriter，信息页、卷标、章节通过write写入，最后调用close
     """
-    epub = zipfile.ZipFile(output_file, 'w')
+    sequence = ['info.txt'] + [d[0] for d in document_order(chapter_data, filenames, '.txt')]
+    return TxtWriter(output_file, sequence, config.reorder_buffer)
 
-    if config.format_type == 'epub2':
-        epubfile = EPUB2.epubfile()
-        if config.html_vol:
-            epubfile.htmlvol = 1
-    else:
-        epubfile = EPUB3.epubfile()
 
-    epubfile.csstext = config.css_text
-    epubfile.createEpub(epub, author, title, dir_name, index, roll_sign, base_path)
+def epub_documents(chapter_data, filenames):
+    """
+    EPUB中的文件顺序：封面、信息页，章节与卷标，最后为封面图片
+    :param chapter_data: ChapterData
+    :param filenames: chapter_filenames的结果
+    :return: [(文件名, 类型, 目录标题)]
+    """
+    return ([('C.xhtml', 'cover', ''), ('info.xhtml', 'info', '')]
+            + document_order(chapter_data, filenames, '.xhtml')
+            + [('zp.jpg', 'image', '')])
+
+
+class EpubWriter(ChapterWriter):
+    """
+    流式写入EPUB：章节完成后交给压缩线程池并行压缩，再由单独的写入线程按提交顺序追加到zip，
+    不再经过暂存目录；目录、清单等元数据在close时按章节元数据生成
+    """
+    def __init__(self, output_file, config, queue_size=256):
+        """
+        :param output_file: 输出文件路径，写入期间为.part临时文件
+        :param config: DownloadConfig
+        :param queue_size: 等待写入的文件数上限，写入跟不上时阻塞下载线程
+        """
+        self.output_file = output_file
+        self._tmp = output_file + '.part'
+        # 只生成txt时不加载EPUB相关模块
+        import EPUB2
+        import EPUB3
+        import zipwriter
+
+        if config.format_type == 'epub2':
+            self._epubfile = EPUB2.epubfile()
+            if config.html_vol:
+                self._epubfile.htmlvol = 1
+        else:
+            self._epubfile = EPUB3.epubfile()
+        self._epubfile.csstext = config.css_text
+
+        self.level = min(9, max(0, config.compress_level))
+        self.workers = config.compress_workers or os.cpu_count() or 1
+        self._pool = concurrent.futures.ThreadPoolExecutor(self.workers)
+        self._stats_lock = threading.Lock()
+        self._stats = {'files': 0, 'bytes': 0, 'compressed': 0, 'seconds': 0.0}
+
+        self._compress_entry = zipwriter.compress_entry
+        self._zip = zipwriter.ZipWriter(self._tmp)
+        self._epubfile.create_mimetype(self._zip)
+        self._epubfile.create_container(self._zip)
+        self._written = set()
+        self._error = None
+        self._aborted = False
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, filename, data):
+        """
+        追加一个文件到OEBPS目录
+        :param filename: 文件名
+        :param data: str或bytes
+        """
+        if self._error is not None:
+            raise self._error
+        if self._aborted:
+            return
+        self._queue.put((filename, self._pool.submit(self._compress, data)))
+
+    def _compress(self, data):
+        start = time.perf_counter()
+        entry = self._compress_entry(data, self.level)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats['files'] += 1
+            self._stats['bytes'] += entry[2]
+            self._stats['compressed'] += len(entry[3])
+            self._stats['seconds'] += elapsed
+        return entry
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            filename, future = item
+            try:
+                self._zip.write_entry('OEBPS/' + filename, future.result())
+                self._written.add(filename)
+            except Exception as e:
+                self._error = e
+
+    def _join(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._pool.shutdown()
+
+    def stats(self):
+        """
+        :return: dict，files压缩的文件数、bytes原始大小、compressed压缩后大小、seconds各线程压缩耗时之和
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def close(self, author, title, chapter_data, filenames):
+        """
+        写入元数据并完成文件
+        :param author: 作者
+        :param title: 书名
+        :param chapter_data: ChapterData（index、roll_sign为目录与卷标）
+        :param filenames: chapter_filenames的结果
+        """
+        self._join()
+        if self._error is not None:
+            self.abort()
+            raise self._error
+        documents = [d for d in epub_documents(chapter_data, filenames) if d[0] in self._written]
+        from EPUB import EpubBook
+
+        self._epubfile.createEpub(self._zip, EpubBook(title, author, documents))
+        self._zip.close()
+        os.replace(self._tmp, self.output_file)
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self._aborted = True
+        self._join()
+        self._zip.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+
+def create_epub(output_file, config):
+    """
+    创建EPUB文件
+    :param output_file: 输出文件路径
+    :param config: DownloadConfig
+    :return: EpubWriter，章节、卷标、封面、信息页通过write写入，最后调用close
+    """
+    return EpubWriter(output_file, config)
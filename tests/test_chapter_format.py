@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+"""
+chapter.format_content输出一致性测试
+legacy_format_content为改写前逐行拼接的实现，新实现在各选项组合下须与之逐字节一致
+运行：python -m pytest tests 或 python -m unittest discover tests
+"""
+import os
+import re
+import sys
+import html
+import random
+import itertools
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chapter
+import utils
+from models import DownloadConfig
+
+
+def _legacy_clean_text(text):
+    text = re.sub('@无限好文，尽在晋江文学城', '', text)
+    text = re.sub('　+', ' ', text)
+    text = re.sub(' +', ' ', text)
+    return text
+
+
+def _legacy_escape_html(text):
+    text = html.escape(text)
+    text = re.sub("&amp;amp;", "&amp;", text)
+    text = re.sub("&amp;gt;", "&gt;", text)
+    text = re.sub("&amp;lt;", "&lt;", text)
+    text = re.sub('&amp;#', '&#', text)
+    return text
+
+
+def legacy_format_content(title, raw_data, config, fill_num):
+    """改写前的format_content"""
+    tex = raw_data['content']
+    tex1 = raw_data['sayBody']
+    sign = raw_data['upDown']
+    texm = raw_data['message']
+    is_txt = config.format_type == 'txt'
+
+    content = ''
+    if is_txt:
+        title_display = html.unescape(title)
+        content += "\n\n" + title_display + "\n"
+    else:
+        title_display = _legacy_escape_html(title)
+        title_display = re.sub('&amp;amp;', '&amp;', title_display)
+        content += '<h2>' + title_display + "</h2>"
+
+    if len(tex) == 0:
+        if is_txt:
+            content += texm + "\n"
+        else:
+            content += '<p>' + texm + '</p>'
+        return content, True
+    else:
+        if config.show_chinfo:
+            if is_txt:
+                content += "字数：" + raw_data['chapterSize'] + '\n日期：' + raw_data['chapterDate'] + '\r\n'
+            else:
+                content += "<p class='note'>字数：" + raw_data['chapterSize'] + '<br/>日期：' + raw_data['chapterDate'] + '</p>'
+
+        if config.del_thanks:
+            tex1 = utils.remove_thanks_content(tex1)
+
+        tex1 = _legacy_clean_text(tex1)
+        tex1 = _legacy_escape_html(tex1)
+        tex = _legacy_clean_text(tex)
+        tex = _legacy_escape_html(tex)
+
+        contenta = ''
+        contentb = '' if is_txt else '<p>'
+
+        if len(tex1.strip()):
+            if not is_txt:
+                contenta += "<p><b>作者有话要说</b>：</p><blockquote>"
+            else:
+                contenta += "作者有话要说：\n"
+            for v in tex1.splitlines():
+                if is_txt:
+                    v = html.unescape(v).strip()
+                    contenta += v + "\n"
+                else:
+                    contenta += "<p>" + v + "</p>"
+            if not is_txt:
+                contenta += "</blockquote>"
+
+        for v in tex.splitlines():
+            if is_txt:
+                v = html.unescape(v).strip()
+                v = re.sub(r'^</?p>$', '', v)
+                v = re.sub(r'</?p>', '', v)
+                contentb += v + "\n"
+            else:
+                contentb += v + "<br/>"
+        if not is_txt:
+            contentb += "</p>"
+            contentb = re.sub(r' ?<br/> ?<br/> ?', '</p><p>', contentb)
+
+        if is_txt and config.remove_blank_lines:
+            lines = contentb.split('\n')
+            contentb = '\n'.join(line for line in lines if line.strip()) + '\n'
+
+        separator = "\n*\n" if is_txt else "<hr/>"
+        if sign:
+            content += contentb + separator + contenta
+        else:
+            content += contenta + separator + contentb
+
+    if not is_txt:
+        content += "</body></html>"
+
+    content = re.sub("<p> *</p>", "<p><br/></p>", content)
+    content = re.sub("(<p><br/></p>)+", "<p><br/></p>", content)
+    content = utils.convert_text(content, config.state)
+
+    return content, False
+
+
+# 随机文本的组成片段，覆盖空白、标签、实体及各类换行
+_PIECES = ['晋江', '說話', ' ', '  ', '　', '　　', '\n', '\n\n', '\r\n', '\r', ' ', '<p>', '</p>',
+           '<br/>', ' <br/> ', '&amp;', '&lt;b&gt;', '&#10;', '&#13;', '&amp;amp;gt;', '&', '<', '>',
+           '"', "'", '@无限好文，尽在晋江文学城', '感谢在2024投出地雷的小天使', '扔了1个手榴弹', 'abc', '123']
+
+
+def _random_text(rng, n):
+    return ''.join(rng.choice(_PIECES) for _ in range(n))
+
+
+def _config(format_type, **options):
+    config = DownloadConfig()
+    config.format_type = format_type
+    for key, value in options.items():
+        setattr(config, key, value)
+    return config
+
+
+def _raw(content, say_body='', up_down=0, message='', size='', date=''):
+    return {'content': content, 'sayBody': say_body, 'upDown': up_down, 'message': message,
+            'chapterSize': size, 'chapterDate': date}
+
+
+# (格式, 选项, 标题, 原始数据, 期望输出)
+FIXED_CASES = [
+    ('txt', {}, '1 第一章 开端',
+     _raw('　　第一段&lt;b&gt;\n\n　　第二段 @无限好文，尽在晋江文学城\n', '感谢阅读\n', 1,
+          size='1200', date='2024-01-01 12:00:00'),
+     ('\n\n1 第一章 开端\n第一段<b>\n\n第二段\n\n*\n作者有话要说：\n感谢阅读\n', False)),
+    ('txt', {'show_chinfo': True, 'remove_blank_lines': True, 'state': 't'}, '2 第二章',
+     _raw('<p>简体中文</p>\n\n\n<p>后来</p>', size='30', date='2024-02-02'),
+     ('\n\n2 第二章\n字數：30\n日期：2024-02-02\r\n\n*\n簡體中文\n後來\n', False)),
+    ('epub3', {'show_chinfo': True}, '3 A&B <章>',
+     _raw('第一行<br/>第二行\n\n第三行 & 更多', '作者的话', size='8', date='2024-03-03'),
+     ("<h2>3 A&amp;B &lt;章&gt;</h2><p class='note'>字数：8<br/>日期：2024-03-03</p>"
+      "<p><b>作者有话要说</b>：</p><blockquote><p>作者的话</p></blockquote><hr/>"
+      "<p>第一行&lt;br/&gt;第二行</p><p>第三行 &amp; 更多<br/></p></body></html>", False)),
+    ('epub2', {}, '4 锁章', _raw('', up_down='', message='用晋江币购买章节后即可阅读'),
+     ('<h2>4 锁章</h2><p>用晋江币购买章节后即可阅读</p>', True)),
+]
+
+
+class FormatContentTest(unittest.TestCase):
+    def test_fixed_cases(self):
+        for format_type, options, title, raw, expected in FIXED_CASES:
+            with self.subTest(title=title):
+                config = _config(format_type, **options)
+                self.assertEqual(chapter.format_content(title, dict(raw), config, 4), expected)
+                self.assertEqual(legacy_format_content(title, dict(raw), config, 4), expected)
+
+    def test_parity_with_legacy(self):
+        rng = random.Random(0)
+        combos = list(itertools.product(['txt', 'epub2'], ['', 's'], [False, True], [False, True], [False, True]))
+        for i in range(2000):
+            format_type, state, chinfo, del_thanks, rm_blank = combos[i % len(combos)]
+            config = _config(format_type, state=state, show_chinfo=chinfo, del_thanks=del_thanks,
+                             remove_blank_lines=rm_blank)
+            raw = _raw('' if i % 17 == 0 else _random_text(rng, rng.randint(0, 60)),
+                       _random_text(rng, rng.randint(0, 20)), rng.choice([0, 1, '']),
+                       _random_text(rng, 3), str(i), '2024-01-01')
+            title = _random_text(rng, 4)
+            with self.subTest(case=i, format_type=format_type, state=state):
+                self.assertEqual(chapter.format_content(title, dict(raw), config, 4),
+                                 legacy_format_content(title, dict(raw), config, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
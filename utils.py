@@ -5,7 +5,46 @@
 """
 import re
 import html
-from opencc import OpenCC
+import threading
+
+
+# 繁简转换方向对应的OpenCC配置
+_CONVERSIONS = {'s': 't2s', 't': 's2t'}
+# 已加载词典的转换器，初始化后convert只读词典，可在线程间共享
+_converters = {}
+_converters_lock = threading.Lock()
+# 连续的全角/半角空格
+_SPACES = re.compile('[　 ]+')
+# 一键感谢相关内容
+_THANKS = re.compile(
+    r'(感谢灌溉)[\w\W]+(.).*感谢(灌|投|支持).*|'
+    r'感谢(在|为).*小天使.*|'
+    r'.*(扔|投|砸|灌)了.*时间.*|'
+    r'.*\\d瓶.*|'
+    r'.*(扔|投|砸|灌|谢).*(手榴弹|营养液|地雷|浅水炸弹|深水炸弹|深水鱼雷|火箭炮|投雷|霸王票).*|'
+    r'非常感谢.*努力的.*'
+)
+
+
+def get_converter(state):
+    """
+    获取缓存的转换器，首次使用时加载词典
+    :param state: 's' 繁转简, 't' 简转繁
+    :return: OpenCC，state无需转换时返回None
+    """
+    conversion = _CONVERSIONS.get(state)
+    if conversion is None:
+        return None
+    converter = _converters.get(conversion)
+    if converter is None:
+        with _converters_lock:
+            converter = _converters.get(conversion)
+            if converter is None:
+                from opencc import OpenCC  # 只在需要繁简转换时加载
+
+                converter = OpenCC(conversion)
+                _converters[conversion] = converter
+    return converter
 
 
 def convert_text(text, state):
@@ -15,11 +54,10 @@ def convert_text(text, state):
     :param state: 's' 繁转简, 't' 简转繁, '' 不变
     :return: 转换后的文本
     """
-    if state == 's':
-        return OpenCC('t2s').convert(text)
-    elif state == 't':
-        return OpenCC('s2t').convert(text)
-    return text
+    converter = get_converter(state)
+    if converter is None:
+        return text
+    return converter.convert(text)
 
 
 def clean_text(text):
@@ -28,10 +66,9 @@ def clean_text(text):
     :param text: 原始文本
     :return: 清理后的文本
     """
-    text = re.sub('@无限好文，尽在晋江文学城', '', text)
-    text = re.sub('　+', ' ', text)
-    text = re.sub(' +', ' ', text)
-    return text
+    text = text.replace('@无限好文，尽在晋江文学城', '')
+    # 全角与半角空格的连续组合统一为一个空格
+    return _SPACES.sub(' ', text)
 
 
 def escape_html(text):
@@ -40,11 +77,12 @@ def escape_html(text):
     :param text: 原始文本
     :return: 转义后的文本
     """
+    # 依次替换，结果与逐个re.sub相同
     text = html.escape(text)
-    text = re.sub("&amp;amp;", "&amp;", text)
-    text = re.sub("&amp;gt;", "&gt;", text)
-    text = re.sub("&amp;lt;", "&lt;", text)
-    text = re.sub('&amp;#', '&#', text)
+    text = text.replace("&amp;amp;", "&amp;")
+    text = text.replace("&amp;gt;", "&gt;")
+    text = text.replace("&amp;lt;", "&lt;")
+    text = text.replace('&amp;#', '&#')
     return text
 
 
@@ -75,12 +113,4 @@ def remove_thanks_content(text):
     :param text: 原始文本
     :return: 清理后的文本
     """
-    pattern = (
-        r'(感谢灌溉)[\w\W]+(.).*感谢(灌|投|支持).*|'
-        r'感谢(在|为).*小天使.*|'
-        r'.*(扔|投|砸|灌)了.*时间.*|'
-        r'.*\\d瓶.*|'
-        r'.*(扔|投|砸|灌|谢).*(手榴弹|营养液|地雷|浅水炸弹|深水炸弹|深水鱼雷|火箭炮|投雷|霸王票).*|'
-        r'非常感谢.*努力的.*'
-    )
-    return re.sub(pattern, '', text)
+    return _THANKS.sub('', text)
@@ -0,0 +1,78 @@
+# -*- coding: UTF-8 -*-
+"""
+只写zip模块
+条目可以先在多个线程中压缩好，再按顺序写入归档，用于并行压缩EPUB
+"""
+import time
+import zlib
+import struct
+import zipfile
+
+
+def compress_entry(data, level):
+    """
+    压缩一个条目；zlib压缩时释放GIL，可在多个线程中并行调用
+    :param data: str或bytes
+    :param level: 压缩级别，0为不压缩(存储)
+    :return: (压缩方式, crc32, 原始大小, 写入的数据)
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    crc = zlib.crc32(data)
+    if level == 0:
+        return zipfile.ZIP_STORED, crc, len(data), data
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return zipfile.ZIP_DEFLATED, crc, len(data), compressor.compress(data) + compressor.flush()
+
+
+class ZipWriter:
+    """
+    顺序写入的zip文件，writestr与zipfile.ZipFile兼容
+    不支持zip64（单个文件与整个归档小于4GB、条目少于65535个）
+    """
+    def __init__(self, path):
+        self._fp = open(path, 'wb')
+        self._entries = []
+        t = time.localtime()
+        self._date = (t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+        self._time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+
+    def write_entry(self, name, entry):
+        """
+        写入compress_entry压缩好的条目
+        :param name: 归档中的路径
+        :param entry: compress_entry的返回值
+        """
+        method, crc, size, payload = entry
+        offset = self._fp.tell()
+        if max(offset, size, len(payload)) > 0xFFFFFFFF or len(self._entries) >= 0xFFFF:
+            raise zipfile.LargeZipFile('归档过大，需要zip64')
+        filename = name.encode('utf-8')
+        flags = 0 if name.isascii() else 0x800  # 0x800: 文件名为UTF-8
+        self._fp.write(struct.pack(
+            '<4s5H3L2H', b'PK\x03\x04', 20, flags, method, self._time, self._date,
+            crc, len(payload), size, len(filename), 0))
+        self._fp.write(filename)
+        self._fp.write(payload)
+        self._entries.append((filename, flags, method, crc, len(payload), size, offset))
+
+    def writestr(self, name, data, compress_type=zipfile.ZIP_STORED):
+        level = 0 if compress_type == zipfile.ZIP_STORED else 6
+        self.write_entry(name, compress_entry(data, level))
+
+    def close(self):
+        """写入中央目录并关闭文件"""
+        if self._fp is None:
+            return
+        start = self._fp.tell()
+        for filename, flags, method, crc, csize, size, offset in self._entries:
+            self._fp.write(struct.pack(
+                '<4s6H3L5H2L', b'PK\x01\x02', 20, 20, flags, method, self._time, self._date,
+                crc, csize, size, len(filename), 0, 0, 0, 0, 0o600 << 16, offset))
+            self._fp.write(filename)
+        end = self._fp.tell()
+        self._fp.write(struct.pack(
+            '<4s4H2LH', b'PK\x05\x06', 0, 0, len(self._entries), len(self._entries),
+            end - start, start, 0))
+        self._fp.close()
+        self._fp = None